@@ -18,7 +18,17 @@ class Extension(ext.Extension):
     def get_config_schema(self):
         schema = super().get_config_schema()
         schema["explore_songs"] = config.Integer(optional=True)
+        schema["max_items"] = config.Integer(optional=True, minimum=1)
+        schema["max_search_results"] = config.Integer(optional=True, minimum=1)
+        schema["max_staleness"] = config.Integer(optional=True, minimum=0)
         schema["auth_token"] = config.Secret()
+        schema["rate_limit"] = config.Integer(optional=True, minimum=1)
+        schema["rate_limit_burst"] = config.Integer(optional=True, minimum=1)
+        schema["rate_limit_wait"] = config.Boolean(optional=True)
+        schema["max_retries"] = config.Integer(optional=True, minimum=0)
+        schema["retry_max_time"] = config.Integer(optional=True, minimum=0)
+        schema["persistent_cache"] = config.Boolean(optional=True)
+        schema["prefetch_tracks"] = config.Integer(optional=True, minimum=0)
         schema["explore"] = config.Deprecated()
         schema["explore_pages"] = config.Deprecated()
         return schema
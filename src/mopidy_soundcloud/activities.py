@@ -0,0 +1,63 @@
+import threading
+from collections import OrderedDict
+
+
+class ActivityRing:
+    """Bounded, de-duplicated list of the most recent activity origins.
+
+    Origins are the tracks and playlists of the user's stream. Merging an
+    origin that is already known moves it to the front instead of adding it
+    twice, and the oldest origins are dropped once ``maxsize`` is reached.
+    ``cursor`` is the ``future_href`` to fetch newer activities from.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.cursor = None
+        self.version = 0
+        # Oldest first, so the newest origin is moved to the end
+        self._origins = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._origins)
+
+    def __contains__(self, origin):
+        return self.key(origin) in self._origins
+
+    def __iter__(self):
+        """Yields the origins, newest first"""
+        with self._lock:
+            origins = list(self._origins.values())
+        return reversed(origins)
+
+    @staticmethod
+    def key(origin):
+        return origin.get("kind"), origin.get("id")
+
+    def merge(self, origins, cursor=None):
+        """Adds ``origins``, given newest first, in front of the known ones"""
+        with self._lock:
+            for origin in reversed(origins):
+                key = self.key(origin)
+                self._origins.pop(key, None)
+                self._origins[key] = origin
+            while len(self._origins) > self.maxsize:
+                self._origins.popitem(last=False)
+            if cursor:
+                self.cursor = cursor
+            if origins:
+                self.version += 1
+
+    def replace(self, origins, cursor=None):
+        with self._lock:
+            self._origins.clear()
+            self.cursor = None
+            self.version += 1
+        self.merge(origins, cursor)
+
+    def to_json(self):
+        return {"cursor": self.cursor, "origins": list(self)}
+
+    def load(self, data):
+        self.replace(data.get("origins", []), data.get("cursor"))
@@ -1,7 +1,9 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 import pykka
 from mopidy import backend
+from mopidy.core import Core, CoreListener
 
 from mopidy_soundcloud.library import SoundCloudLibraryProvider
 from mopidy_soundcloud.soundcloud import SoundCloudClient
@@ -9,7 +11,7 @@ from mopidy_soundcloud.soundcloud import SoundCloudClient
 logger = logging.getLogger(__name__)
 
 
-class SoundCloudBackend(pykka.ThreadingActor, backend.Backend):
+class SoundCloudBackend(pykka.ThreadingActor, backend.Backend, CoreListener):
     def __init__(self, config, audio):
         super().__init__()
         self.config = config
@@ -19,10 +21,54 @@ class SoundCloudBackend(pykka.ThreadingActor, backend.Backend):
 
         self.uri_schemes = ["soundcloud", "sc"]
 
+        self.prefetch_tracks = config["soundcloud"].get("prefetch_tracks") or 0
+        # Core is queried off the actor thread, as it may be waiting on us
+        self._tracklist_watcher = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="SoundCloudTracklist"
+        )
+
     def on_start(self):
         username = self.remote.user.get("username")
         if username is not None:
             logger.info(f"Logged in to SoundCloud as {username!r}")
+        self.remote.warm_up()
+
+    def on_stop(self):
+        self._tracklist_watcher.shutdown(wait=False, cancel_futures=True)
+        self.remote.close()
+
+    def track_playback_started(self, tl_track):
+        if self.prefetch_tracks:
+            self._tracklist_watcher.submit(self._prefetch_after, tl_track)
+
+    def tracklist_changed(self):
+        if self.prefetch_tracks:
+            self._tracklist_watcher.submit(self._prefetch_after)
+
+    def _prefetch_after(self, tl_track=None):
+        """Prefetches the stream URLs of the entries after ``tl_track``, the
+        current track by default, or the first entries if nothing plays"""
+        cores = pykka.ActorRegistry.get_by_class(Core)
+        if not cores:
+            return
+        core = cores[0].proxy()
+        tracklist = core.tracklist
+        try:
+            if tl_track is None:
+                tl_track = core.playback.get_current_tl_track().get()
+            index = -1 if tl_track is None else tracklist.index(tl_track).get()
+            if index is None:
+                return
+            upcoming = tracklist.slice(index + 1, index + 1 + self.prefetch_tracks)
+            uris = [tl.track.uri for tl in upcoming.get()]
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Failed to get upcoming tracks for prefetching: {e}")
+            return
+        self.remote.prefetch_stream_urls(
+            self.remote.parse_track_uri(uri)
+            for uri in uris
+            if uri.startswith("soundcloud:song")
+        )
 
 
 class SoundCloudPlaybackProvider(backend.PlaybackProvider):
@@ -30,7 +76,4 @@ class SoundCloudPlaybackProvider(backend.PlaybackProvider):
 
     def translate_uri(self, uri):
         track_id = self.backend.remote.parse_track_uri(uri)
-        track = self.backend.remote.get_track(track_id, True)  # noqa: FBT003
-        if track is None:
-            return None
-        return track.uri
+        return self.backend.remote.get_stream_url(track_id)
@@ -0,0 +1,337 @@
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import suppress
+from functools import lru_cache, partial, update_wrapper
+from typing import Self, overload
+
+logger = logging.getLogger(__name__)
+
+
+class CacheEntry:
+    __slots__ = ("expires", "hits", "size", "value")
+
+    def __init__(self, value, expires, size):
+        self.value = value
+        self.expires = expires
+        self.hits = 0
+        self.size = size
+
+
+class LRUCache:
+    """Bounded, thread safe key/value store with LRU eviction.
+
+    Every entry expires after ``ttl`` seconds or after it has been served
+    ``ctl`` times, whichever comes first. Expired entries are kept for another
+    ``stale`` seconds, during which :meth:`get_stale` still returns them.
+
+    With ``sizeof``, the sizes of the values it measures are added up and
+    reported as ``bytes`` by :meth:`stats`. With ``maxbytes`` as well, entries
+    are also evicted once that total is exceeded, and values larger than
+    ``maxbytes`` aren't kept at all.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        maxsize=1024,
+        ttl=3600,
+        ctl=None,
+        stale=0,
+        clock=time.monotonic,
+        *,
+        maxbytes=None,
+        sizeof=None,
+    ):
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.ttl = ttl
+        self.ctl = ctl
+        self.stale = stale
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._is_stale(entry)
+
+    def _is_stale(self, entry):
+        if self.clock() >= entry.expires:
+            return True
+        return self.ctl is not None and entry.hits >= self.ctl
+
+    def _is_dead(self, entry):
+        return self.clock() >= entry.expires + self.stale
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_stale(entry):
+                if entry is not None and self._is_dead(entry):
+                    self._remove(key)
+                self.misses += 1
+                return default
+            entry.hits += 1
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def get_stale(self, key, default=None):
+        """Returns the value for ``key``, even if it expired less than
+        ``stale`` seconds ago"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            if self._is_dead(entry):
+                self._remove(key)
+                return default
+            return entry.value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        size = self.sizeof(value) if self.sizeof is not None else 0
+        entry = CacheEntry(value, self.clock() + ttl, size)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            if self.maxbytes is not None and entry.size > self.maxbytes:
+                # Would evict everything else and still not fit
+                return
+            self._entries[key] = entry
+            self.bytes += entry.size
+            while len(self._entries) > self.maxsize or (
+                self.maxbytes is not None and self.bytes > self.maxbytes
+            ):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key].value
+            self._remove(key)
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+            if self.sizeof is not None:
+                stats["bytes"] = self.bytes
+            return stats
+
+
+class cache:  # noqa: N801
+    """Memoize a function or method in a bounded :class:`LRUCache`.
+
+    When used on a method, every instance gets its own store so that clients
+    never share (or evict) each other's entries. Concurrent calls with the
+    same arguments share a single call of the function.
+
+    With ``stale``, expired results are returned for that many more seconds
+    while they are refreshed in the background. Instances can set their own
+    ``stale`` and executor for refreshing with :meth:`_Memoized.serve_stale`.
+    """
+
+    def __init__(self, ctl=8, ttl=3600, maxsize=1024, stale=0):
+        self.ctl = ctl
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.stale = stale
+        self.func = None
+        self._shared = self._new_store()
+        self._instances = weakref.WeakKeyDictionary()
+        self._executors = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def _new_store(self):
+        return LRUCache(
+            maxsize=self.maxsize, ttl=self.ttl, ctl=self.ctl, stale=self.stale
+        )
+
+    def __call__(self, func):
+        self.func = func
+        return _Memoized(self)
+
+    def store_for(self, instance):
+        """Returns the store used for ``instance``, ``None`` for unbound calls"""
+        if instance is None:
+            return self._shared
+        with self._lock:
+            store = self._instances.get(instance)
+            if store is None:
+                store = self._instances[instance] = self._new_store()
+            return store
+
+    def serve_stale(self, instance, stale, executor):
+        self.store_for(instance).stale = stale
+        with self._lock:
+            self._executors[instance] = executor
+
+    def executor_for(self, args):
+        """Returns the executor refreshing stale results of a call"""
+        executor = None
+        if args:
+            with suppress(TypeError):
+                executor = self._executors.get(args[0])
+        return executor or get_default_executor()
+
+    def lookup(self, args):
+        try:
+            store = self.store_for(args[0]) if args else self._shared
+            key = args[1:]
+        except TypeError:
+            # First argument can't be weakly referenced, so it is not an
+            # instance and is part of the key
+            store = self._shared
+            key = args
+        return store, key
+
+    def join(self, store, key, missing):
+        """Returns the cached value, the future of a call in flight, or a new
+        future the caller must resolve with :meth:`land`"""
+        with self._lock:
+            value = store.get(key, missing)
+            if value is not missing:
+                return value, None, False
+            future = self._in_flight.get((store, key))
+            if future is not None:
+                return missing, future, False
+            future = self._in_flight[store, key] = Future()
+            return missing, future, True
+
+    def land(self, store, key, future, value=None, error=None):
+        with self._lock:
+            if error is None:
+                store.set(key, value)
+            del self._in_flight[store, key]
+        if error is None:
+            future.set_result(value)
+        else:
+            future.set_exception(error)
+
+
+@lru_cache(maxsize=1)
+def get_default_executor():
+    """Executor refreshing stale results of callers without their own"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="SoundCloudRevalidate")
+
+
+class _Memoized:
+    def __init__(self, decorator):
+        self.decorator = decorator
+        update_wrapper(self, decorator.func)
+
+    @overload
+    def __get__(self, instance: None, owner=None) -> Self: ...
+
+    @overload
+    def __get__(self, instance: object, owner=None) -> partial: ...
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return partial(self, instance)
+
+    def __call__(self, *args):
+        store, key = self.decorator.lookup(args)
+        missing = object()
+        try:
+            value, future, leader = self.decorator.join(store, key, missing)
+        except TypeError:
+            return self.decorator.func(*args)
+        if value is not missing:
+            return value
+
+        if store.stale:
+            value = store.get_stale(key, missing)
+            # The leader refreshes the value right away if it can't do so later
+            if value is not missing and (
+                not leader or self._revalidate_later(store, key, future, args)
+            ):
+                return value
+
+        if not leader:
+            return future.result()
+        return self._refresh(store, key, future, args)
+
+    def _refresh(self, store, key, future, args):
+        try:
+            value = self.decorator.func(*args)
+        except BaseException as e:
+            self.decorator.land(store, key, future, error=e)
+            raise
+        self.decorator.land(store, key, future, value)
+        return value
+
+    def _revalidate_later(self, store, key, future, args):
+        """Refreshes a stale value in the background, returns whether it could"""
+        executor = self.decorator.executor_for(args)
+        try:
+            executor.submit(self._revalidate, store, key, future, args)
+        except RuntimeError:
+            # Executor was shut down
+            return False
+        return True
+
+    def _revalidate(self, store, key, future, args):
+        try:
+            self._refresh(store, key, future, args)
+        except Exception as e:  # noqa: BLE001
+            logger.warning(f"Failed to refresh stale cached result: {e}")
+
+    def get_cached(self, *args, default=None):
+        """Returns the cached value for ``args`` without calling the function"""
+        store, key = self.decorator.lookup(args)
+        return store.get(key, default)
+
+    def set_cached(self, *args, value):
+        """Stores ``value`` as the result for ``args``"""
+        store, key = self.decorator.lookup(args)
+        store.set(key, value)
+
+    def pop_cached(self, *args, default=None):
+        """Removes and returns the cached value for ``args``"""
+        store, key = self.decorator.lookup(args)
+        return store.pop(key, default)
+
+    def serve_stale(self, instance, stale, executor):
+        """Returns results of ``instance`` up to ``stale`` seconds after they
+        expired, while they are refreshed on ``executor``"""
+        self.decorator.serve_stale(instance, stale, executor)
+
+    def cache_info(self, instance=None):
+        return self.decorator.store_for(instance).stats()
+
+    def cache_clear(self, instance=None):
+        self.decorator.store_for(instance).clear()
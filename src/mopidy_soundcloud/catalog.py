@@ -0,0 +1,97 @@
+import threading
+
+
+class CatalogSet:
+    """Contents of a set as seen in a listing.
+
+    ``items`` holds a track record for every track the listing included, the
+    bare track ID of those it truncated to just their ID, and ``None`` for
+    those that turned out not to be playable. When the listing left tracks
+    out altogether, there are fewer items than ``track_count``. ``ids`` holds
+    the track IDs of the items, if known.
+    """
+
+    __slots__ = ("ids", "items", "name", "track_count")
+
+    def __init__(self, name, items, track_count, ids=None):
+        self.name = name
+        self.items = items
+        self.track_count = track_count
+        self.ids = ids
+
+    def merge(self, known):
+        """Keeps the tracks already resolved in ``known``, an earlier entry of
+        the same set"""
+        if self.ids is None or known.ids is None:
+            return
+        if (
+            self.track_count == known.track_count
+            and known.ids[: len(self.ids)] == self.ids
+        ):
+            # The set didn't change, but may have been completed since
+            self.ids = known.ids
+            self.items = known.items
+            return
+        resolved = {
+            track_id: item
+            for track_id, item in zip(known.ids, known.items, strict=False)
+            if not isinstance(item, str)
+        }
+        self.items = [
+            resolved.get(item, item) if isinstance(item, str) else item
+            for item in self.items
+        ]
+
+    @property
+    def complete(self):
+        return len(self.items) >= self.track_count
+
+    def missing(self, start=0, stop=None):
+        """Returns the IDs of the tracks between ``start`` and ``stop`` that
+        still have to be fetched"""
+        return [item for item in self.items[start:stop] if isinstance(item, str)]
+
+
+class SetCatalog:
+    """Parsed contents of the sets seen while listing sets, so browsing into
+    a set doesn't download and parse it again."""
+
+    def __init__(self):
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sets)
+
+    def __contains__(self, set_id):
+        return set_id in self._sets
+
+    def add(self, set_id, name, items, track_count=None, ids=None):
+        entry = CatalogSet(name, list(items), track_count or len(items), ids)
+        with self._lock:
+            known = self._sets.get(set_id)
+            if known is not None:
+                entry.merge(known)
+            self._sets[set_id] = entry
+        return entry
+
+    def get(self, set_id):
+        with self._lock:
+            return self._sets.get(set_id)
+
+    def fill(self, set_id, track_ids, tracks):
+        """Replaces the bare ``track_ids`` of a set by their records in
+        ``tracks``, or by ``None`` if they couldn't be resolved. Other IDs are
+        left to be resolved later. Positions are kept, so pages of the set
+        stay where they are."""
+        track_ids = set(track_ids)
+        with self._lock:
+            entry = self._sets.get(set_id)
+            if entry is None:
+                return
+            entry.items = [
+                tracks.get(item)
+                if isinstance(item, str) and item in track_ids
+                else item
+                for item in entry.items
+            ]
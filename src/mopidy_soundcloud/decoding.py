@@ -0,0 +1,108 @@
+import functools
+import json
+import logging
+from typing import TypedDict
+from urllib.parse import urlparse
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+
+# The schemas only list the fields the extension reads. With msgspec, all
+# other fields of a response are skipped while decoding instead of being
+# turned into Python objects.
+
+
+class User(TypedDict, total=False):
+    id: int
+    username: str | None
+
+
+class Track(TypedDict, total=False):
+    kind: str
+    id: int
+    title: str | None
+    streamable: bool | None
+    label_name: str | None
+    user: User
+    date: str | None
+    duration: int | None
+    permalink_url: str | None
+    sharing: str | None
+    stream_url: str | None
+    last_modified: str | None
+
+
+class Resource(Track, total=False):
+    """A track, playlist or user, as found in collections"""
+
+    tracks: list[Track]
+    track_count: int | None
+    username: str | None
+
+
+class Activity(TypedDict, total=False):
+    origin: Resource | None
+
+
+class Page(TypedDict, total=False):
+    collection: list[Resource]
+    next_href: str | None
+    future_href: str | None
+
+
+class ActivityPage(TypedDict, total=False):
+    collection: list[Activity]
+    next_href: str | None
+    future_href: str | None
+
+
+# Endpoints without linked partitioning return a plain list
+PAGE = Page | list[Resource]
+
+# Schemas of the collections by the last segment of their API path
+COLLECTION_SCHEMAS = {
+    "activities": ActivityPage,
+    "favorites": PAGE,
+    "followings": PAGE,
+    "playlists": PAGE,
+    "tracks": PAGE,
+}
+
+
+def get_schema(url):
+    """Returns the schema of the response of an API ``url``, or ``None`` if
+    it has to be decoded in full"""
+    segment = urlparse(url).path.rstrip("/").rpartition("/")[2]
+    if segment.isdigit() or segment == "resolve":
+        return Resource
+    return COLLECTION_SCHEMAS.get(segment)
+
+
+@functools.cache
+def get_decoder(schema):
+    if msgspec is None:
+        msg = "Decoding with a schema requires msgspec"
+        raise ImportError(msg)
+    return msgspec.json.Decoder(schema)
+
+
+def decode(content, schema=None):
+    """Decodes a JSON response body
+
+    If msgspec is installed and a ``schema`` is given, only the fields of the
+    schema are decoded. Otherwise the whole document is, with msgspec if it is
+    installed, or else the standard library.
+    """
+    if msgspec is None:
+        return json.loads(content)
+    if schema is not None:
+        try:
+            return get_decoder(schema).decode(content)
+        except msgspec.ValidationError as e:
+            logger.debug(f"Response doesn't match its schema, decoding all: {e}")
+    return msgspec.json.decode(content)
@@ -0,0 +1,65 @@
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class EventLoopThread:
+    """Runs an asyncio event loop in a dedicated thread.
+
+    Coroutines fan out blocking calls with :meth:`run_blocking`, which runs
+    them on a pool of ``max_workers`` threads shared by all coroutines, so
+    the number of requests in flight stays bounded however many are queued.
+    Each request still holds one of those threads until it completes, the
+    loop only decides which requests run and when.
+    :meth:`run` and :meth:`submit` let synchronous code, like the Pykka
+    actors, wait for or schedule coroutines.
+    """
+
+    def __init__(self, max_workers, name="SoundCloudLoop"):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"{name}Worker"
+        )
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.executor)
+        self._thread = threading.Thread(
+            target=self._run_forever, name=name, daemon=True
+        )
+        self._thread.start()
+
+    def _run_forever(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """Schedules ``coro`` and returns a :class:`concurrent.futures.Future`"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Runs ``coro`` and blocks until it returns"""
+        if threading.current_thread() is self._thread:
+            coro.close()
+            msg = "Can't block the event loop waiting for itself"
+            raise RuntimeError(msg)
+        return self.submit(coro).result(timeout)
+
+    def call_later(self, delay, func, *args):
+        """Calls ``func(*args)`` on the loop thread after ``delay`` seconds"""
+        self.loop.call_soon_threadsafe(self.loop.call_later, delay, func, *args)
+
+    async def run_blocking(self, func, *args, **kwargs):
+        """Awaits ``func(*args, **kwargs)`` run on the worker threads"""
+        return await self.loop.run_in_executor(
+            None, functools.partial(func, *args, **kwargs)
+        )
+
+    def close(self):
+        if self.loop.is_closed():
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,155 @@
+import logging
+from http import HTTPStatus
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from mopidy_soundcloud.cache import LRUCache
+from mopidy_soundcloud.ratelimit import ThrottlingHttpAdapter
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+# Cached responses are revalidated by every request, so they may live for long
+HTTP_CACHE_TTL = 24 * 60 * 60
+
+# Budgets for the bodies kept in memory and on disk
+HTTP_CACHE_MAX_BYTES = 16 * 1024 * 1024
+HTTP_CACHE_MAX_DISK_BYTES = 64 * 1024 * 1024
+
+# The disk cache is pruned on the first write and then every that many writes
+PRUNE_INTERVAL = 64
+
+
+class HttpCache:
+    """Validators and bodies of responses, for making conditional requests.
+
+    Responses are kept in memory and, when a :class:`MetadataStore` is
+    given, on disk so they can be revalidated after a restart. Both are
+    bounded by the size of the bodies, and the disk cache forgets the
+    responses downloaded longest ago first.
+    """
+
+    def __init__(
+        self,
+        maxsize=128,
+        store=None,
+        maxbytes=HTTP_CACHE_MAX_BYTES,
+        max_disk_bytes=HTTP_CACHE_MAX_DISK_BYTES,
+    ):
+        self.memory = LRUCache(
+            maxsize=maxsize,
+            ttl=HTTP_CACHE_TTL,
+            maxbytes=maxbytes,
+            sizeof=lambda entry: len(entry["body"]),
+        )
+        self.store = store
+        self.max_disk_bytes = max_disk_bytes
+        self._writes = 0
+
+    def get(self, url):
+        entry = self.memory.get(url)
+        if entry is None and self.store is not None:
+            entry = self.store.get(url)
+            if entry is not None:
+                self.memory.set(url, entry)
+        return entry
+
+    def set(self, url, response):
+        headers = {
+            name: response.headers[name]
+            for name in CACHED_HEADERS
+            if name in response.headers
+        }
+        entry = {
+            "headers": headers,
+            # Latin-1 maps every byte to a code point, so bodies survive JSON
+            "body": response.content.decode("latin-1"),
+        }
+        self.memory.set(url, entry)
+        if self.store is not None:
+            self.store.set(url, entry)
+            if self._writes % PRUNE_INTERVAL == 0:
+                self.store.prune(self.max_disk_bytes)
+            self._writes += 1
+
+    def stats(self):
+        return self.memory.stats()
+
+
+def is_cacheable(response):
+    if response.status_code != HTTPStatus.OK:
+        return False
+    if "no-store" in response.headers.get("Cache-Control", ""):
+        return False
+    return "ETag" in response.headers or "Last-Modified" in response.headers
+
+
+def conditional_headers(entry):
+    headers = {}
+    if "ETag" in entry["headers"]:
+        headers["If-None-Match"] = entry["headers"]["ETag"]
+    if "Last-Modified" in entry["headers"]:
+        headers["If-Modified-Since"] = entry["headers"]["Last-Modified"]
+    return headers
+
+
+class CachedResponse(requests.Response):
+    """Full response rebuilt from the cache after a ``304 Not Modified``"""
+
+    from_cache = True
+
+
+def build_cached_response(entry, not_modified):
+    """Turns a ``304 Not Modified`` response into the cached full response"""
+    resp = CachedResponse()
+    resp.status_code = HTTPStatus.OK
+    resp.reason = "OK"
+    resp.headers = CaseInsensitiveDict(entry["headers"])
+    resp.headers.update(
+        {
+            name: not_modified.headers[name]
+            for name in CACHED_HEADERS
+            if name in not_modified.headers
+        }
+    )
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp._content = entry["body"].encode("latin-1")  # noqa: SLF001
+    resp.url = not_modified.url
+    resp.request = not_modified.request
+    resp.elapsed = not_modified.elapsed
+    return resp
+
+
+class CachingHttpAdapter(ThrottlingHttpAdapter):
+    """Rate limited adapter that revalidates cached GET responses with
+    ``If-None-Match`` / ``If-Modified-Since`` instead of downloading them
+    again."""
+
+    def __init__(self, limiter, cache=None, **kwargs):
+        super().__init__(limiter, **kwargs)
+        self.cache = cache or HttpCache()
+        self.not_modified = 0
+
+    def send(self, request, **kwargs):
+        if request.method != "GET":
+            return super().send(request, **kwargs)
+
+        entry = self.cache.get(request.url)
+        if entry is not None:
+            request.headers.update(conditional_headers(entry))
+
+        resp = super().send(request, **kwargs)
+        if entry is not None and resp.status_code == HTTPStatus.NOT_MODIFIED:
+            logger.debug(f"Not modified since cached: {request.url}")
+            self.not_modified += 1
+            resp.close()
+            cached = build_cached_response(entry, resp)
+            cached.connection = self
+            return cached
+        if not kwargs.get("stream") and is_cacheable(resp):
+            self.cache.set(request.url, resp)
+        return resp
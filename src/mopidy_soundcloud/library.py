@@ -7,7 +7,10 @@ import urllib.parse
 from typing import TYPE_CHECKING
 
 from mopidy import backend, models
-from mopidy.models import SearchResult, Track
+from mopidy.models import SearchResult
+
+from mopidy_soundcloud.records import TrackRecord
+from mopidy_soundcloud.searchindex import is_indexed
 
 if TYPE_CHECKING:
     from mopidy_soundcloud.actor import SoundCloudBackend
@@ -23,6 +26,10 @@ def new_folder(name, path):
     return models.Ref.directory(uri=generate_uri(path), name=name)
 
 
+def to_tracks(records):
+    return [record.to_track() for record in records]
+
+
 def simplify_search_query(query):
     if isinstance(query, dict):
         r = []
@@ -53,66 +60,90 @@ class SoundCloudLibraryProvider(backend.LibraryProvider):
     def add_to_vfs(self, _model):
         self.vfs["soundcloud:directory"][_model.uri] = _model
 
-    def list_sets(self):
+    def list_sets(self, page=1):
+        sets, more = self.backend.remote.get_sets_page(page)
         sets_vfs = collections.OrderedDict()
-        for name, set_id, _tracks in self.backend.remote.get_sets():
+        for name, set_id, _tracks in sets:
             sets_list = new_folder(name, ["sets", set_id])
             logger.debug(f"Adding set {sets_list.name} to VFS")
             sets_vfs[set_id] = sets_list
-        return list(sets_vfs.values())
+        return self.with_next_page(list(sets_vfs.values()), ["sets"], page, more)
 
-    def list_liked(self):
+    def list_liked(self, page=1):
+        tracks, more = self.backend.remote.get_likes_page(page)
         vfs_list = collections.OrderedDict()
-        for track in self.backend.remote.get_likes():
+        for track in tracks:
             logger.debug(f"Adding liked track {track.name} to VFS")
-            vfs_list[track.name] = models.Ref.track(uri=track.uri, name=track.name)
-        return list(vfs_list.values())
+            vfs_list[track.uri] = track.to_ref()
+        return self.with_next_page(list(vfs_list.values()), ["liked"], page, more)
 
-    def list_user_follows(self):
+    def list_user_follows(self, page=1):
+        users, more = self.backend.remote.get_followings_page(page)
         sets_vfs = collections.OrderedDict()
-        for name, user_id in self.backend.remote.get_followings():
+        for name, user_id in users:
             sets_list = new_folder(name, ["following", user_id])
             logger.debug(f"Adding set {sets_list.name} to VFS")
             sets_vfs[user_id] = sets_list
-        return list(sets_vfs.values())
+        return self.with_next_page(list(sets_vfs.values()), ["following"], page, more)
+
+    def list_user_tracks(self, user_id, page=1):
+        tracks, more = self.backend.remote.get_tracks_page(page, user_id)
+        refs = self.tracklist_to_vfs(tracks)
+        return self.with_next_page(refs, ["following", user_id], page, more)
+
+    def list_tracks(self, track_list, path, page=1):
+        """Lists one page of a list of tracks fetched in one go"""
+        size = self.backend.remote.explore_songs
+        start = (page - 1) * size
+        refs = self.tracklist_to_vfs(track_list[start : start + size])
+        return self.with_next_page(refs, path, page, len(track_list) > start + size)
+
+    def with_next_page(self, refs, path, page, more):
+        if more:
+            next_page = str(page + 1)
+            refs.append(new_folder(f"Page {next_page}", [*path, "page", next_page]))
+        return refs
 
     def tracklist_to_vfs(self, track_list):
         vfs_list = collections.OrderedDict()
         for temp_track in track_list:
-            if not isinstance(temp_track, Track):
+            if not isinstance(temp_track, TrackRecord):
                 temp_track = self.backend.remote.parse_track(temp_track)  # noqa: PLW2901
             if hasattr(temp_track, "uri"):
-                vfs_list[temp_track.name] = models.Ref.track(
-                    uri=temp_track.uri, name=temp_track.name
-                )
+                vfs_list[temp_track.uri] = temp_track.to_ref()
         return list(vfs_list.values())
 
     def browse(self, uri):  # noqa: PLR0911
         if not self.vfs.get(uri):
-            (req_type, res_id) = re.match(r".*:(\w*)(?:/(\d*))?", uri).groups()
+            (req_type, res_id, page) = re.match(
+                r".*:(\w*)(?:/(\d+))?(?:/page/(\d+))?", uri
+            ).groups()
+            page = int(page or 1)
             # Sets
             if req_type == "sets":
                 if res_id:
-                    return self.tracklist_to_vfs(self.backend.remote.get_set(res_id))
-                return self.list_sets()
+                    tracks, more = self.backend.remote.get_set_page(res_id, page)
+                    refs = self.tracklist_to_vfs(tracks)
+                    return self.with_next_page(refs, ["sets", res_id], page, more)
+                return self.list_sets(page)
             # Following
             if req_type == "following":
                 if res_id:
-                    return self.tracklist_to_vfs(self.backend.remote.get_tracks(res_id))
-                return self.list_user_follows()
+                    return self.list_user_tracks(res_id, page)
+                return self.list_user_follows(page)
             # Liked
             if req_type == "liked":
-                return self.list_liked()
+                return self.list_liked(page)
             # User stream
             if req_type == "stream":
-                return self.tracklist_to_vfs(self.backend.remote.get_user_stream())
+                return self.list_tracks(
+                    self.backend.remote.get_user_stream(), ["stream"], page
+                )
 
         # root directory
         return list(self.vfs.get(uri, {}).values())
 
     def search(self, query=None, uris=None, exact=False):  # noqa: ARG002, FBT002
-        # TODO: Support exact search
-
         if not query:
             return None
 
@@ -124,19 +155,56 @@ class SoundCloudLibraryProvider(backend.LibraryProvider):
             logger.info(f"Resolving SoundCloud for: {search_query}")
             return SearchResult(
                 uri="soundcloud:search",
-                tracks=self.backend.remote.resolve_url(search_query),
+                tracks=to_tracks(self.backend.remote.resolve_url(search_query)),
             )
-        search_query = simplify_search_query(query)
-        logger.info(f"Searching SoundCloud for: {search_query}")
-        return SearchResult(
-            uri="soundcloud:search",
-            tracks=self.backend.remote.search(search_query),
-        )
+        remote = self.backend.remote
+        # Fields the index doesn't hold, e.g. dates, can only be matched remotely
+        tracks = []
+        if is_indexed(query):
+            tracks = remote.search_index.search(query, exact=exact)
+        # Only ask SoundCloud when the tracks seen so far can't fill a page
+        if len(tracks) < remote.explore_songs:
+            search_query = simplify_search_query(query)
+            logger.info(f"Searching SoundCloud for: {search_query}")
+            found = remote.search(query, exact=exact)
+            seen = {track.uri for track in tracks}
+            tracks.extend(track for track in found if track.uri not in seen)
+        return SearchResult(uri="soundcloud:search", tracks=to_tracks(tracks))
+
+    def lookup_many(self, uris):
+        uris = list(dict.fromkeys(uris))
+        track_ids = {}
+        results = {}
+        for uri in uris:
+            track_id = "" if "sc:" in uri else self.backend.remote.parse_track_uri(uri)
+            # Only numeric IDs can be fetched in batches by the tracks endpoint
+            if track_id.isdigit():
+                track_ids[uri] = track_id
+            else:
+                results[uri] = self.lookup(uri)
+
+        try:
+            tracks = {
+                self.backend.remote.parse_track_uri(track): track
+                for track in self.backend.remote.resolve_tracks(
+                    dict.fromkeys(track_ids.values())
+                )
+            }
+        except Exception as error:  # noqa: BLE001
+            logger.error(f"Failed to lookup {len(track_ids)} tracks: {error}")  # noqa: TRY400
+            tracks = {}
+
+        for uri, track_id in track_ids.items():
+            track = tracks.get(track_id)
+            if track is None:
+                logger.info(f"Failed to lookup {uri}: SoundCloud track not found")
+            results[uri] = [track.to_track()] if track else []
+        return {uri: results[uri] for uri in uris}
 
     def lookup(self, uri):
         if "sc:" in uri:
             uri = uri.replace("sc:", "")
-            return self.backend.remote.resolve_url(uri)
+            return to_tracks(self.backend.remote.resolve_url(uri))
 
         try:
             track_id = self.backend.remote.parse_track_uri(uri)
@@ -148,4 +216,4 @@ class SoundCloudLibraryProvider(backend.LibraryProvider):
             logger.error(f"Failed to lookup {uri}: {error}")  # noqa: TRY400
             return []
         else:
-            return [track]
+            return [track.to_track()]
@@ -0,0 +1,163 @@
+import datetime as dt
+import logging
+import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Mopidy fields searched as free text with the `q` parameter
+TEXT_FIELDS = (
+    "any",
+    "track_name",
+    "artist",
+    "albumartist",
+    "performer",
+    "album",
+    "comment",
+)
+
+# Format of the `created_at` range parameters
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def date_range(value):
+    """Returns the ``created_at`` range covered by a Mopidy date, which may be
+    a year, a month or a day, e.g. ``2014``, ``2014-05`` or ``2014-05-21``"""
+    match = re.fullmatch(r"(\d{4})(?:-(\d{1,2}))?(?:-(\d{1,2}))?", value.strip())
+    if match is None:
+        return None
+    year = int(match.group(1))
+    month, day = (int(part) if part else None for part in match.groups()[1:])
+    try:
+        start = dt.datetime(year, month or 1, day or 1)  # noqa: DTZ001
+    except ValueError:
+        return None
+    if day:
+        end = start + dt.timedelta(days=1)
+    elif month:
+        end = (start + dt.timedelta(days=31)).replace(day=1)
+    else:
+        end = start.replace(year=year + 1)
+    end -= dt.timedelta(seconds=1)
+    return start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)
+
+
+def normalize_query(query):
+    """Returns a hashable key which is the same for equivalent queries"""
+    if not isinstance(query, dict):
+        query = {"any": query}
+    key = []
+    for field, values in sorted(query.items()):
+        if isinstance(values, str):
+            values = [values]  # noqa: PLW2901
+        normalized = (" ".join(value.casefold().split()) for value in values)
+        key.append((field, tuple(value for value in normalized if value)))
+    return tuple(key)
+
+
+def split_query(query):
+    """Returns the text, genres and date ranges of a Mopidy query"""
+    if not isinstance(query, dict):
+        query = {"any": query}
+    words = []
+    genres = []
+    ranges = []
+    for field, values in query.items():
+        if isinstance(values, str):
+            values = [values]  # noqa: PLW2901
+        values = [value for value in values if value and value.strip()]  # noqa: PLW2901
+        if field in TEXT_FIELDS:
+            words.extend(values)
+        elif field == "genre":
+            genres.extend(values)
+        elif field == "date":
+            ranges.extend(filter(None, map(date_range, values)))
+        elif values:
+            logger.debug(f"SoundCloud can't search by {field}, ignoring {values}")
+    return words, genres, list(dict.fromkeys(ranges))
+
+
+def plan_search(query):
+    """Returns the parameters of the API requests answering a Mopidy query
+
+    Text fields are combined into one ``q``, and genres into one ``genres``
+    filter, which matches any of them. A request only takes one
+    ``created_at`` range, so every date gets a request of its own.
+    """
+    words, genres, ranges = split_query(query)
+    params = []
+    if words:
+        params.append(("q", " ".join(words)))
+    if genres:
+        params.append(("genres", ",".join(genres)))
+    if not params and not ranges:
+        return []
+
+    plans = []
+    for created_at in ranges or [None]:
+        plan = list(params)
+        if created_at:
+            plan.append(("created_at[from]", created_at[0]))
+            plan.append(("created_at[to]", created_at[1]))
+        plans.append(plan)
+    return plans
+
+
+class SearchResults:
+    """Tracks found by a search, collected page by page in the background
+
+    :meth:`wait` returns as soon as every request of the search delivered its
+    first page. Later pages are added as they arrive, until ``budget`` tracks
+    were found. ``failed`` is set if a request ended without its first page.
+    """
+
+    def __init__(self, budget, requests):
+        self.budget = budget
+        self.failed = False
+        self._tracks = {}
+        self._pending = requests
+        self._running = requests
+        self._first_pages = threading.Event()
+        self._complete = threading.Event()
+        self._lock = threading.Lock()
+        if not requests:
+            self._first_pages.set()
+            self._complete.set()
+
+    @property
+    def full(self):
+        return len(self._tracks) >= self.budget
+
+    @property
+    def complete(self):
+        return self._complete.is_set()
+
+    def add(self, tracks):
+        with self._lock:
+            for track in tracks:
+                if self.full:
+                    break
+                self._tracks.setdefault(track.uri, track)
+
+    def first_page_done(self, *, failed=False):
+        with self._lock:
+            self.failed = self.failed or failed
+            self._pending -= 1
+            if self._pending <= 0:
+                self._first_pages.set()
+
+    def request_done(self):
+        with self._lock:
+            self._running -= 1
+            if self._running <= 0:
+                self._complete.set()
+
+    def tracks(self):
+        with self._lock:
+            return list(self._tracks.values())
+
+    def wait(self, timeout=None, complete=False):  # noqa: FBT002
+        """Returns the tracks found once the first pages, or all pages if
+        ``complete`` is set, have arrived"""
+        (self._complete if complete else self._first_pages).wait(timeout)
+        return self.tracks()
@@ -0,0 +1,263 @@
+import email.utils
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http import HTTPStatus
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Rate limit reset values above this are timestamps rather than durations
+TIMESTAMP_THRESHOLD = 1_000_000_000
+
+
+def parse_retry_after(value, now=time.time):
+    """Returns the number of seconds to wait for a ``Retry-After`` header"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(date.timestamp() - now(), 0)
+
+
+def parse_rate_limit_reset(headers, now=time.time):
+    """Returns the seconds until the server grants requests again, if exhausted"""
+    if headers.get("X-RateLimit-Remaining") != "0":
+        return None
+    try:
+        reset = float(headers.get("X-RateLimit-Reset", ""))
+    except ValueError:
+        return None
+    # Some servers send a timestamp, others a number of seconds
+    if reset > TIMESTAMP_THRESHOLD:
+        reset -= now()
+    return max(reset, 0)
+
+
+class TokenBucket:
+    """Thread safe token bucket allowing ``rate`` requests per second on
+    average and bursts of up to ``burst`` requests."""
+
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.tokens = burst
+        self.updated = clock()
+        self.paused_until = 0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            elapsed = now - max(self.updated, self.paused_until)
+            if elapsed > 0:
+                self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def _take(self):
+        """Takes a token, or returns the seconds until one is available"""
+        with self._lock:
+            now = self.clock()
+            if now < self.paused_until:
+                return self.paused_until - now
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self, blocking=True, timeout=None):  # noqa: FBT002
+        """Takes a token, waiting for one if ``blocking`` is set.
+
+        Returns whether a token was taken. Without waiting, if no token can
+        be available within ``timeout`` seconds.
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            wait = self._take()
+            if wait == 0:
+                return True
+            if not blocking:
+                return False
+            if deadline is not None and wait > deadline - self.clock():
+                return False
+            self.sleep(wait)
+
+    def pause(self, seconds):
+        """Grants no tokens for ``seconds``, e.g. when the server asks so"""
+        with self._lock:
+            self.tokens = 0
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+
+class RateLimiter(TokenBucket):
+    """Token bucket with a per thread choice of waiting or failing fast"""
+
+    def __init__(self, *args, blocking=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.default_blocking = blocking
+        self._local = threading.local()
+
+    @property
+    def blocking(self):
+        return getattr(self._local, "blocking", self.default_blocking)
+
+    @contextmanager
+    def fail_fast(self):
+        """Requests in this block fail with 429 instead of waiting for a token"""
+        previous = self.blocking
+        self._local.blocking = False
+        try:
+            yield
+        finally:
+            self._local.blocking = previous
+
+
+class RetryPolicy:
+    """When and how long to wait before retrying a failed request
+
+    Only idempotent requests are retried, with exponential backoff and full
+    jitter, until ``max_retries`` retries or ``max_time`` seconds are spent.
+    """
+
+    methods = frozenset({"DELETE", "GET", "HEAD", "OPTIONS", "PUT"})
+    statuses = frozenset(
+        {
+            HTTPStatus.TOO_MANY_REQUESTS,
+            HTTPStatus.INTERNAL_SERVER_ERROR,
+            HTTPStatus.BAD_GATEWAY,
+            HTTPStatus.SERVICE_UNAVAILABLE,
+            HTTPStatus.GATEWAY_TIMEOUT,
+        }
+    )
+
+    def __init__(
+        self,
+        max_retries=3,
+        max_time=30,
+        backoff=0.5,
+        request_timeout=10,
+        jitter=random.random,
+    ):
+        self.max_retries = max_retries
+        self.max_time = max_time
+        self.backoff = backoff
+        self.request_timeout = request_timeout
+        self.jitter = jitter
+
+    def delay(self, attempt):
+        return self.jitter() * self.backoff * 2**attempt
+
+    @property
+    def max_wait(self):
+        """Seconds a request may wait for the rate limiter before failing"""
+        return max(self.max_time, self.request_timeout)
+
+    def is_retryable(self, request, attempt):
+        return request.method in self.methods and attempt < self.max_retries
+
+
+class ThrottledResponse(requests.Response):
+    """``429 Too Many Requests`` made up by the client instead of sent by
+    SoundCloud, which isn't worth retrying"""
+
+
+class ThrottlingHttpAdapter(HTTPAdapter):
+    def __init__(self, limiter, retry=None, **kwargs):
+        super().__init__(**kwargs)
+        self.limiter = limiter
+        self.retry = retry or RetryPolicy(max_retries=0)
+        self.retries = 0
+        self.failures = 0
+
+    def send(self, request, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = self.retry.request_timeout
+        start = self.limiter.clock()
+        attempt = 0
+        while True:
+            try:
+                resp = self._send(request, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                delay = self.retry.delay(attempt)
+                if self._gives_up(request, attempt, start, delay):
+                    raise
+                reason = e
+            else:
+                if resp.status_code not in self.retry.statuses or isinstance(
+                    resp, ThrottledResponse
+                ):
+                    return resp
+                delay = self.retry.delay(attempt)
+                if self._gives_up(request, attempt, start, delay):
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+                resp.close()
+
+            attempt += 1
+            self.retries += 1
+            logger.debug(
+                f"Retrying {request.method} {request.url} in {delay:.1f}s "
+                f"(attempt {attempt}/{self.retry.max_retries}): {reason}"
+            )
+            self.limiter.sleep(delay)
+
+    def _gives_up(self, request, attempt, start, delay):
+        elapsed = self.limiter.clock() - start
+        if (
+            self.retry.is_retryable(request, attempt)
+            and elapsed + delay <= self.retry.max_time
+        ):
+            return False
+        self.failures += 1
+        return True
+
+    def pool_stats(self):
+        """Number of requests and connections opened by the connection pools"""
+        pools = self.poolmanager.pools
+        pools = [pool for pool in map(pools.get, pools.keys()) if pool]
+        connections = sum(pool.num_connections for pool in pools)
+        requests_sent = sum(pool.num_requests for pool in pools)
+        return {
+            "connections": connections,
+            "requests": requests_sent,
+            "reused": requests_sent - connections,
+        }
+
+    def _send(self, request, **kwargs):
+        # Pauses asked for by the server may last hours, e.g. once the daily
+        # quota is used up, so requests fail instead of waiting that long
+        if not self.limiter.acquire(
+            blocking=self.limiter.blocking, timeout=self.retry.max_wait
+        ):
+            logger.debug(f"Request throttling of {request.url}")
+            resp = ThrottledResponse()
+            resp.request = request
+            resp.url = request.url
+            resp.status_code = HTTPStatus.TOO_MANY_REQUESTS
+            resp.reason = (
+                f"Client throttled to {self.limiter.rate:.1f} requests per second"
+            )
+            return resp
+
+        resp = super().send(request, **kwargs)
+        wait = parse_retry_after(resp.headers.get("Retry-After"))
+        if wait is None:
+            wait = parse_rate_limit_reset(resp.headers)
+        if wait is None and resp.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            wait = 1 / self.limiter.rate
+        if wait:
+            logger.debug(f"SoundCloud asked to wait {wait:.1f}s before next request")
+            self.limiter.pause(wait)
+        return resp
@@ -0,0 +1,64 @@
+import sys
+
+from mopidy.models import Album, Artist, Ref, Track
+from mopidy.types import DurationMs
+
+# Album of every SoundCloud track
+SOUNDCLOUD_ALBUM = Album(name="SoundCloud")
+
+
+class TrackRecord:
+    """Compact metadata of a track, as held by the client and its caches.
+
+    A record takes a fraction of the memory of a Mopidy :class:`Track` and
+    its artist and album models. Artist names are interned, so the tracks of
+    an artist share one string. Mopidy models are only built, by
+    :meth:`to_track` and :meth:`to_ref`, when tracks are handed to Mopidy.
+    """
+
+    __slots__ = ("artist", "comment", "date", "length", "name", "uri")
+
+    def __init__(  # noqa: PLR0913
+        self, uri, *, name=None, artist=None, length=0, comment="", date=None
+    ):
+        self.uri = uri
+        self.name = name
+        self.artist = sys.intern(artist) if artist else None
+        self.length = length
+        self.comment = comment
+        self.date = date
+
+    def __eq__(self, other):
+        if not isinstance(other, TrackRecord):
+            return NotImplemented
+        return all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__
+        )
+
+    def __hash__(self):
+        return hash(self.uri)
+
+    def __repr__(self):
+        return f"TrackRecord(uri={self.uri!r}, name={self.name!r})"
+
+    @property
+    def artists(self):
+        return frozenset([Artist(name=self.artist)]) if self.artist else frozenset()
+
+    @property
+    def album(self):
+        return SOUNDCLOUD_ALBUM if self.name is not None else None
+
+    def to_track(self):
+        return Track(
+            uri=self.uri,
+            name=self.name,
+            artists=self.artists,
+            album=self.album,
+            length=DurationMs(self.length),
+            comment=self.comment,
+            date=self.date,
+        )
+
+    def to_ref(self):
+        return Ref.track(uri=self.uri, name=self.name)
@@ -0,0 +1,179 @@
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+# Mopidy search fields and the indexed track field they are matched against
+QUERY_FIELDS = {
+    "any": "any",
+    "track_name": "track_name",
+    "artist": "artist",
+    "albumartist": "artist",
+    "performer": "artist",
+    "album": "album",
+    "comment": "permalink",
+}
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKD", text or "").casefold()
+    return "".join(c for c in text if not unicodedata.combining(c)).strip()
+
+
+def tokenize(text):
+    return re.findall(r"\w+", normalize(text))
+
+
+def track_fields(track):
+    """Returns the searchable text of ``track`` by field"""
+    fields = {
+        "track_name": [track.name or ""],
+        "artist": [artist.name or "" for artist in track.artists],
+        "album": [track.album.name or ""] if track.album else [],
+        # Only the path of permalinks identifies the track
+        "permalink": [urlparse(track.comment or "").path.replace("/", " ")],
+    }
+    fields["any"] = [value for values in fields.values() for value in values]
+    return fields
+
+
+class IndexEntry:
+    __slots__ = ("exact", "seq", "tokens", "track")
+
+    def __init__(self, track, seq):
+        self.track = track
+        self.seq = seq
+        fields = track_fields(track)
+        self.exact = {
+            field: {normalize(value) for value in values}
+            for field, values in fields.items()
+        }
+        self.tokens = {
+            field: {token for value in values for token in tokenize(value)}
+            for field, values in fields.items()
+        }
+
+
+class SearchIndex:
+    """Inverted index over the title, artist, album and permalink of the
+    tracks seen while browsing, for answering searches without the API.
+
+    The index holds up to ``maxsize`` tracks and forgets the ones least
+    recently added first.
+    """
+
+    def __init__(self, maxsize=16384):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._postings = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, uri):
+        return uri in self._entries
+
+    def add(self, track):
+        with self._lock:
+            entry = self._entries.get(track.uri)
+            self._seq += 1
+            if entry is not None and entry.track is track:
+                entry.seq = self._seq
+                self._entries.move_to_end(track.uri)
+                return
+            if entry is not None:
+                self._remove(track.uri)
+            entry = self._entries[track.uri] = IndexEntry(track, self._seq)
+            for token in entry.tokens["any"]:
+                self._postings.setdefault(token, set()).add(track.uri)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, uri):
+        entry = self._entries.pop(uri)
+        for token in entry.tokens["any"]:
+            uris = self._postings[token]
+            uris.discard(uri)
+            if not uris:
+                del self._postings[token]
+
+    def search(self, query, exact=False):  # noqa: FBT002
+        """Returns the tracks matching a Mopidy search ``query``
+
+        Every term must match. Without ``exact``, all words of a term must be
+        in the field. With ``exact``, the term must equal the whole field.
+        Tracks matching in the title come first, then recently added ones.
+        """
+        terms = parse_query(query)
+        if not terms:
+            return []
+        with self._lock:
+            candidates = None
+            for _field, value in terms:
+                for token in tokenize(value):
+                    uris = self._postings.get(token, set())
+                    candidates = uris if candidates is None else candidates & uris
+            if candidates is None:
+                # Terms without any word can only match exactly
+                candidates = set(self._entries)
+            entries = [
+                self._entries[uri]
+                for uri in candidates
+                if matches(self._entries[uri], terms, exact)
+            ]
+        entries.sort(key=lambda entry: (-title_hits(entry, terms), -entry.seq))
+        return [entry.track for entry in entries]
+
+
+def parse_query(query):
+    """Returns the ``(field, value)`` terms of a query that can be indexed"""
+    if not isinstance(query, dict):
+        query = {"any": query}
+    terms = []
+    for name, values in query.items():
+        field = QUERY_FIELDS.get(name)
+        if field is None:
+            continue
+        if isinstance(values, str):
+            values = [values]  # noqa: PLW2901
+        terms.extend((field, value) for value in values if value)
+    return terms
+
+
+def is_indexed(query):
+    """Returns whether the index can evaluate every field of ``query``"""
+    if not isinstance(query, dict):
+        return True
+    return all(name in QUERY_FIELDS for name, values in query.items() if values)
+
+
+def matches(entry, terms, exact):
+    for field, value in terms:
+        if exact:
+            if normalize(value) not in entry.exact[field]:
+                return False
+        elif not set(tokenize(value)) <= entry.tokens[field]:
+            return False
+    return True
+
+
+def title_hits(entry, terms):
+    title = entry.tokens["track_name"]
+    return sum(token in title for _field, value in terms for token in tokenize(value))
+
+
+def rank(tracks, query, exact=False):  # noqa: FBT002
+    """Orders ``tracks`` found elsewhere, e.g. by the API, like :meth:`search`
+
+    With ``exact``, tracks that don't match ``query`` exactly are dropped.
+    Otherwise all are kept, as SoundCloud also matches descriptions and tags.
+    """
+    terms = parse_query(query)
+    entries = [IndexEntry(track, -i) for i, track in enumerate(tracks)]
+    if exact:
+        entries = [entry for entry in entries if matches(entry, terms, exact)]
+    entries.sort(key=lambda entry: (-title_hits(entry, terms), -entry.seq))
+    return [entry.track for entry in entries]
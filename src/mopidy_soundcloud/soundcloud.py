@@ -1,26 +1,78 @@
-import datetime
+import asyncio
+import base64
+import codecs
+import json
 import logging
 import re
 import string
+import threading
 import time
 import unicodedata
 from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import closing
+from html.parser import HTMLParser
 from http import HTTPStatus
-from multiprocessing.pool import ThreadPool
-from urllib.parse import quote_plus
+from urllib.parse import parse_qs, quote_plus, urlencode, urlparse
 
 import requests
-from bs4 import BeautifulSoup
 from mopidy import httpclient
-from mopidy.models import Album, Artist, Track
 from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
 
 import mopidy_soundcloud
+from mopidy_soundcloud.activities import ActivityRing
+from mopidy_soundcloud.cache import LRUCache, cache
+from mopidy_soundcloud.catalog import SetCatalog
+from mopidy_soundcloud.decoding import decode, get_schema
+from mopidy_soundcloud.eventloop import EventLoopThread
+from mopidy_soundcloud.httpcache import CachingHttpAdapter, HttpCache
+from mopidy_soundcloud.query import SearchResults, normalize_query, plan_search
+from mopidy_soundcloud.ratelimit import RateLimiter, RetryPolicy
+from mopidy_soundcloud.records import TrackRecord
+from mopidy_soundcloud.searchindex import SearchIndex, rank
+from mopidy_soundcloud.store import MetadataStore
 
 logger = logging.getLogger(__name__)
 
+# Number of track ids resolved per `tracks?ids=` request
+TRACK_BATCH_SIZE = 50
+
+# Stream URLs are dropped this many seconds before their signature expires
+STREAM_URL_EXPIRY_MARGIN = 60
+
+# Lifetime of stream URLs without a known expiry
+STREAM_URL_TTL = 300
+
+# Stream URLs of queued tracks are resolved again this many seconds before
+# they are dropped from the cache
+STREAM_URL_REFRESH_AHEAD = 30
+
+# Number of stream URLs resolved at once in the background, which leaves the
+# other loop workers to requests made while browsing
+STREAM_PREFETCH_WORKERS = 2
+
+# Bytes read at a time when scanning HTML pages
+PAGE_CHUNK_SIZE = 16 * 1024
+
+# The public client id is scraped again once it is this many seconds old
+CLIENT_ID_MAX_AGE = 6 * 60 * 60
+
+# Number of script bundles searched for the public client id at once
+CLIENT_ID_SCRIPT_WORKERS = 4
+
+# Seconds for which identical searches share their results
+SEARCH_RESULTS_TTL = 60
+
+# Number of blocking requests the event loop runs at once, e.g. for fetching
+# the next page of a listing, batches of tracks or stream URLs
+LOOP_WORKERS = 4
+
+# Connections kept open per host: one per worker thread, plus the Mopidy
+# actors calling the client directly
+API_POOL_SIZE = 1 + LOOP_WORKERS + 2
+PUBLIC_POOL_SIZE = CLIENT_ID_SCRIPT_WORKERS + LOOP_WORKERS
+
 
 def safe_url(uri):
     return quote_plus(unicodedata.normalize("NFKD", uri).encode("ASCII", "ignore"))
@@ -36,12 +88,108 @@ def get_user_url(user_id):
     return "me" if not user_id else f"users/{user_id}"
 
 
-def get_requests_session(proxy_config, user_agent, token, public=False):  # noqa: FBT002
+def track_fingerprint(data):
+    """Cheap fingerprint of the track fields used to build a :class:`TrackRecord`"""
+    last_modified = data.get("last_modified")
+    if last_modified:
+        return last_modified
+    return hash(
+        (
+            data.get("title"),
+            data.get("label_name"),
+            data.get("user", {}).get("username"),
+            data.get("date"),
+            data.get("duration"),
+            data.get("permalink_url"),
+        )
+    )
+
+
+def get_url_expiry(url):
+    """Returns the expiry time of a signed stream URL as a Unix timestamp"""
+    query = parse_qs(urlparse(url).query)
+    if "Expires" in query:
+        return int(query["Expires"][0])
+    if "Policy" not in query:
+        return None
+    # CloudFront uses URL safe base64 with its own substitutions
+    policy = query["Policy"][0].translate(str.maketrans("-_~", "+=/"))
+    try:
+        statement = json.loads(base64.b64decode(policy))["Statement"][0]
+        return int(statement["Condition"]["DateLessThan"]["AWS:EpochTime"])
+    except (ValueError, KeyError, IndexError, TypeError):
+        return None
+
+
+def find_progressive_urls(chunks):
+    """Finds the progressive preview and stream URLs in a permalink page
+
+    Quoted strings are matched across chunk boundaries, and no more chunks
+    are read once both URLs are found.
+    """
+    urls = {}
+    rest = b""
+    for chunk in chunks:
+        pieces = (rest + chunk).split(b'"')
+        # The last piece may continue in the next chunk
+        rest = pieces.pop()
+        for piece in pieces:
+            if piece.endswith(b"preview/progressive"):
+                urls["preview"] = piece.decode()
+            elif piece.endswith(b"stream/progressive"):
+                urls["stream"] = piece.decode()
+
+            if "preview" in urls and "stream" in urls:
+                return urls
+    return urls
+
+
+class ScriptSourceParser(HTMLParser):
+    """Collects the ``src`` of every ``<script>`` tag fed to it"""
+
+    def __init__(self):
+        super().__init__()
+        self.sources = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "script":
+            src = dict(attrs).get("src")
+            if src:
+                self.sources.append(src)
+
+
+def find_script_sources(chunks):
+    """Returns the script URLs of an HTML page read as byte chunks"""
+    parser = ScriptSourceParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk))
+    parser.feed(decoder.decode(b"", final=True))
+    parser.close()
+    return parser.sources
+
+
+def get_bundle_name(script_url):
+    """Strips the content hash from a script bundle URL"""
+    return re.sub(r"-[0-9a-f]+\.js$", "", script_url or "")
+
+
+def get_requests_session(
+    proxy_config,
+    user_agent,
+    token,
+    public=False,  # noqa: FBT002
+    pool_size=None,
+):
     proxy = httpclient.format_proxy(proxy_config)
     full_user_agent = httpclient.format_user_agent(user_agent)
 
     session = requests.Session()
     session.proxies.update({"http": proxy, "https": proxy})
+    if pool_size:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
     if not public:
         session.headers.update({"user-agent": full_user_agent})
         session.headers.update({"Authorization": f"OAuth {token}"})
@@ -57,166 +205,366 @@ def get_mopidy_requests_session(config, public=False):  # noqa: FBT002
         ),
         token=config["soundcloud"]["auth_token"],
         public=public,
+        pool_size=PUBLIC_POOL_SIZE if public else API_POOL_SIZE,
     )
 
 
-class cache:  # noqa: N801
-    # TODO: merge this to util library
-
-    def __init__(self, ctl=8, ttl=3600):
-        self.cache = {}
-        self.ctl = ctl
-        self.ttl = ttl
-        self._call_count = 1
-
-    def __call__(self, func):
-        def _memoized(*args):
-            self.func = func
-            now = time.time()
-            try:
-                value, last_update = self.cache[args]
-                age = now - last_update
-                if self._call_count >= self.ctl or age > self.ttl:
-                    self._call_count = 1
-                    raise AttributeError  # noqa: TRY301
-
-                self._call_count += 1
-
-            except (KeyError, AttributeError):
-                value = self.func(*args)
-                self.cache[args] = (value, now)
-                return value
-
-            except TypeError:
-                return self.func(*args)
-
-            else:
-                return value
-
-        return _memoized
-
-
-class ThrottlingHttpAdapter(HTTPAdapter):
-    def __init__(self, burst_length, burst_window, wait_window):
-        super().__init__()
-        self.max_hits = burst_length
-        self.hits = 0
-        self.rate = burst_length / burst_window
-        self.burst_window = datetime.timedelta(seconds=burst_window)
-        self.total_window = datetime.timedelta(seconds=burst_window + wait_window)
-        self.timestamp = datetime.datetime.min.replace(tzinfo=datetime.UTC)
-
-    def _is_too_many_requests(self):
-        now = datetime.datetime.now(tz=datetime.UTC)
-        if now < self.timestamp + self.total_window:
-            elapsed = now - self.timestamp
-            self.hits += 1
-            if (now < self.timestamp + self.burst_window) and (
-                self.hits < self.max_hits
-            ):
-                return False
-            logger.debug(
-                f"Request throttling after {self.hits} hits in "
-                f"{elapsed.microseconds} us "
-                f"(window until {self.timestamp + self.total_window})"
-            )
-            return True
-        self.timestamp = now
-        self.hits = 0
-        return False
-
-    def send(self, request, **kwargs):
-        if request.method == "HEAD" and self._is_too_many_requests():
-            resp = requests.Response()
-            resp.request = request
-            resp.url = request.url
-            resp.status_code = 429
-            resp.reason = "Client throttled to {self.rate:.1f} requests per second"
-            return resp
-        return super().send(request, **kwargs)
-
-
 class SoundCloudClient:
+    api_url = "https://api.soundcloud.com/"
     public_client_id = None
 
     def __init__(self, config):
         super().__init__()
         self.explore_songs = config["soundcloud"].get("explore_songs", 25)
+        self.max_items = config["soundcloud"].get("max_items") or 500
+        self.max_search_results = config["soundcloud"].get("max_search_results") or 100
+        max_staleness = config["soundcloud"].get("max_staleness")
+        self.max_staleness = 3600 if max_staleness is None else max_staleness
+
+        self.store = None
+        self.http_cache = HttpCache()
+        if config["soundcloud"].get("persistent_cache"):
+            cache_dir = mopidy_soundcloud.Extension.get_cache_dir(config)
+            self.store = MetadataStore(cache_dir / "metadata.sqlite3")
+            self.http_cache.store = MetadataStore(cache_dir / "http.sqlite3")
+
         self.http_client = get_mopidy_requests_session(config)
-        adapter = ThrottlingHttpAdapter(burst_length=3, burst_window=1, wait_window=10)
-        self.http_client.mount("https://api.soundcloud.com/", adapter)
+        self.rate_limiter = RateLimiter(
+            rate=config["soundcloud"].get("rate_limit") or 5,
+            burst=config["soundcloud"].get("rate_limit_burst") or 10,
+            blocking=config["soundcloud"].get("rate_limit_wait", True) is not False,
+        )
+        max_retries = config["soundcloud"].get("max_retries")
+        retry_max_time = config["soundcloud"].get("retry_max_time")
+        retry = RetryPolicy(
+            max_retries=3 if max_retries is None else max_retries,
+            max_time=30 if retry_max_time is None else retry_max_time,
+        )
+        self.http_adapter = CachingHttpAdapter(
+            self.rate_limiter,
+            cache=self.http_cache,
+            retry=retry,
+            pool_connections=API_POOL_SIZE,
+            pool_maxsize=API_POOL_SIZE,
+        )
+        self.http_client.mount(self.api_url, self.http_adapter)
 
         self.public_stream_client = get_mopidy_requests_session(config, public=True)
+        self.parsed_tracks = LRUCache(maxsize=16384, ttl=3600)
+        self.search_index = SearchIndex(maxsize=16384)
+        self.set_catalog = SetCatalog()
+
+        self._revalidated = set()
+        self.activities = ActivityRing(self.max_items)
+        self._activities_lock = threading.Lock()
+        self._stream_tracks = (None, [])
+        self._background = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="SoundCloudRefresh"
+        )
+        # Browse listings are shown out of date while they are refreshed
+        for listing in (
+            SoundCloudClient.get_user_stream,
+            SoundCloudClient._get_page,
+        ):
+            listing.serve_stale(self, self.max_staleness, self._background)
+        self.loop = EventLoopThread(max_workers=LOOP_WORKERS)
+
+        self.stream_urls = LRUCache(maxsize=256, ttl=STREAM_URL_TTL)
+        self._stream_futures = {}
+        self._stream_lock = threading.RLock()
+        self._queued_stream_ids = set()
+        self._prefetch_slots = asyncio.Semaphore(STREAM_PREFETCH_WORKERS)
+
+        self.public_client_script = None
+        self.public_client_id_updated = 0
+        self._client_id_lock = threading.Lock()
+        self._client_id_generation = 0
+        self._client_id_timer = None
+        if self.store is not None:
+            self._load_public_client_id(self.store)
+
+    def close(self):
+        if self._client_id_timer is not None:
+            self._client_id_timer.cancel()
+        self._background.shutdown(wait=False, cancel_futures=True)
+        self.loop.close()
+        if self.store is not None:
+            self.store.close()
+        if self.http_cache.store is not None:
+            self.http_cache.store.close()
+
+    def warm_up(self):
+        """Load the persisted listings and the public client id in the
+        background after a restart"""
+        if self.store is not None:
+            self._background.submit(self._warm_up)
+        if self.public_client_id is None:
+            self._background.submit(self._update_public_client_id)
+        else:
+            self._schedule_public_client_id_refresh()
+
+    def _warm_up(self):
+        self.get_followings_page(1)
+        self.get_sets_page(1)
+        self.get_likes_page(1)
+        self.get_user_stream()
+
+    def cache_stats(self):
+        """Hit, miss, eviction and size counters of this client's caches"""
+        stats = {}
+        for name, attr in vars(type(self)).items():
+            func = attr.fget if isinstance(attr, property) else attr
+            cache_info = getattr(func, "cache_info", None)
+            if cache_info is not None:
+                stats[name] = cache_info(self)
+        stats["parse_track"] = self.parsed_tracks.stats()
+        stats["stream_urls"] = self.stream_urls.stats()
+        stats["http"] = self.http_cache.stats()
+        return stats
+
+    def http_stats(self):
+        """Retry and connection reuse counters of SoundCloud API requests"""
+        return {
+            "retries": self.http_adapter.retries,
+            "failures": self.http_adapter.failures,
+            "not_modified": self.http_adapter.not_modified,
+            **self.http_adapter.pool_stats(),
+        }
 
     @property
     @cache()
     def user(self):
-        return self._get("me")
+        return self._get_persistent("me")
 
     @cache(ttl=10)
     def get_user_stream(self):
         # https://developers.soundcloud.com/docs/api/reference#activities
+        self._sync_activities()
+        version, tracks = self._stream_tracks
+        if version == self.activities.version:
+            return tracks
+
+        version = self.activities.version
         tracks = []
-        stream = self._get("me/activities", limit=True).get("collection", [])
-        for data in stream:
-            kind = data.get("origin")
+        for kind in self.activities:
             # multiple types of track with same data
-            if kind:
-                if kind["kind"] == "track":
-                    tracks.append(self.parse_track(kind))
-                elif kind["kind"] == "playlist":
-                    playlist = kind.get("tracks")
-                    if isinstance(playlist, Iterable):
-                        tracks.extend(self.parse_results(playlist))
-
-        return self.sanitize_tracks(tracks)
+            if kind["kind"] == "track":
+                tracks.append(self.parse_track(kind))
+            elif kind["kind"] == "playlist":
+                playlist = kind.get("tracks")
+                if isinstance(playlist, Iterable):
+                    tracks.extend(self.parse_results(playlist))
+        tracks = self.index_tracks(self.sanitize_tracks(tracks))
+        self._stream_tracks = (version, tracks)
+        return tracks
+
+    def _sync_activities(self):
+        """Fetches the activities posted since the last sync
+
+        Only the first sync of a session reads the whole stream. Later ones
+        follow the ``future_href`` cursor, which is also persisted.
+        """
+        with self._activities_lock:
+            if self.activities.cursor is None and self.store is not None:
+                self.activities.load(self.store.get("me/activities?stream", {}))
+            synced = (self.activities.version, self.activities.cursor)
+
+            if self.activities.cursor is not None:
+                origins, cursor = self._fetch_activities(
+                    self.activities.cursor, known=self.activities
+                )
+                if origins is None:
+                    return
+                if cursor is None:
+                    logger.debug("No activity cursor, reading whole stream")
+                self.activities.merge(origins, cursor)
+                self.activities.cursor = cursor
+
+            if self.activities.cursor is None:
+                origins, cursor = self._fetch_activities(
+                    "me/activities",
+                    limit=True,
+                    params=[("linked_partitioning", "true")],
+                )
+                if origins is None:
+                    return
+                self.activities.replace(origins, cursor)
+
+            changed = (self.activities.version, self.activities.cursor) != synced
+            if changed and self.store is not None:
+                self.store.set("me/activities?stream", self.activities.to_json())
+
+    def _fetch_activities(self, url, known=None, **kwargs):
+        """Returns the origins of the activities at ``url``, newest first, and
+        the cursor for activities posted after them
+
+        Older pages are followed through ``next_href`` until a page is empty
+        or holds an origin in ``known``, as the rest of the stream is known
+        from there.
+        The origins are ``None`` if the request failed.
+        """
+        res = self._get(url, **kwargs)
+        if not res:
+            return None, None
+        origins = []
+        cursor = res.get("future_href")
+        while res:
+            page = [
+                activity["origin"]
+                for activity in res.get("collection", [])
+                if activity.get("origin")
+            ]
+            origins.extend(page)
+            next_href = res.get("next_href")
+            if not next_href or len(origins) >= self.max_items:
+                break
+            if known is not None and (
+                not page or any(origin in known for origin in page)
+            ):
+                break
+            res = self._get(next_href)
+        return origins[: self.max_items], cursor
 
-    @cache(ttl=10)
-    def get_followings(self, user_id=None):
-        user_url = get_user_url(user_id)
+    def parse_users(self, collection):
         users = []
-        playlists = self._get(f"{user_url}/followings", limit=True)
-        for playlist in playlists.get("collection", []):
+        for playlist in collection:
             user_name = playlist.get("username")
             user_id = str(playlist.get("id"))
             logger.debug(f"Fetched user {user_name} with ID {user_id}")
             users.append((user_name, user_id))
         return users
 
-    @cache()
     def get_set(self, set_id):
         # https://developers.soundcloud.com/docs/api/reference#playlists
-        playlist = self._get(f"playlists/{set_id}")
+        playlist = self._get_persistent(f"playlists/{set_id}")
         return playlist.get("tracks", [])
 
-    @cache(ttl=10)
-    def get_sets(self, user_id=None):
-        user_url = get_user_url(user_id)
+    def parse_sets(self, collection):
         playable_sets = []
-        for playlist in self._get(f"{user_url}/playlists", limit=True):
+        for playlist in collection:
             name = playlist.get("title")
             set_id = str(playlist.get("id"))
             tracks = playlist.get("tracks", [])
             logger.debug(f"Fetched set {name} with ID {set_id} ({len(tracks)} tracks)")
-            playable_sets.append((name, set_id, tracks))
+            ids, items = self.parse_set_items(tracks)
+            entry = self.set_catalog.add(
+                set_id,
+                name,
+                items,
+                playlist.get("track_count", len(tracks)),
+                ids,
+            )
+            playable_sets.append((name, set_id, entry.items))
         return playable_sets
 
-    @cache(ttl=10)
-    def get_likes(self, user_id=None):
-        # https://developers.soundcloud.com/docs/api/reference#GET--users--id--favorites
-        user_url = get_user_url(user_id)
-        likes = self._get(f"{user_url}/favorites", limit=True)
-        return self.parse_results(likes)
+    def parse_set_items(self, tracks):
+        """Returns the IDs of the tracks of a set, and the record of each
+        playable one, or just its ID if the API left out everything else"""
+        ids = [str(data.get("id")) for data in tracks]
+        items = []
+        for data in tracks:
+            if "title" not in data and data.get("id") is not None:
+                items.append(str(data["id"]))
+                continue
+            track = self.parse_track(data)
+            items.append(track)
+        self.index_tracks(item for item in items if isinstance(item, TrackRecord))
+        return ids, items
+
+    def get_set_page(self, set_id, number):
+        """Returns page ``number`` of the tracks of a set, and whether more
+        pages follow
+
+        Sets are served from :attr:`set_catalog`. The set is only downloaded
+        if it wasn't listed yet or its listing left tracks out, and tracks
+        truncated to their ID are only fetched once their page is shown.
+        """
+        entry = self.set_catalog.get(set_id)
+        if entry is None or not entry.complete:
+            tracks = self.get_set(set_id)
+            if tracks:
+                name = entry.name if entry else None
+                ids, items = self.parse_set_items(tracks)
+                entry = self.set_catalog.add(set_id, name, items, ids=ids)
+            elif entry is None:
+                return [], False
+        start = (number - 1) * self.explore_songs
+        stop = start + self.explore_songs
+        missing = entry.missing(start, stop)
+        if missing:
+            tracks = {
+                self.parse_track_uri(track): track
+                for track in self.index_tracks(self.resolve_tracks(missing))
+            }
+            self.set_catalog.fill(set_id, missing, tracks)
+        items = [item for item in entry.items[start:stop] if item is not None]
+        return items, len(entry.items) > stop
+
+    def get_followings_page(self, number, user_id=None):
+        """Returns page ``number`` of the followed users, and whether more
+        pages follow"""
+        collection, more = self.get_page(f"{get_user_url(user_id)}/followings", number)
+        return self.parse_users(collection), more
+
+    def get_sets_page(self, number, user_id=None):
+        collection, more = self.get_page(f"{get_user_url(user_id)}/playlists", number)
+        return self.parse_sets(collection), more
+
+    def get_likes_page(self, number, user_id=None):
+        collection, more = self.get_page(f"{get_user_url(user_id)}/favorites", number)
+        return self.index_tracks(self.parse_results(collection)), more
+
+    def get_tracks_page(self, number, user_id=None):
+        collection, more = self.get_page(f"{get_user_url(user_id)}/tracks", number)
+        return self.index_tracks(self.parse_results(collection)), more
+
+    def get_page(self, url, number):
+        """Returns the items on page ``number`` of a collection, and whether
+        more pages follow within ``max_items``
+
+        Pages are reached by following ``next_href`` from the first one, so
+        only the pages up to ``number`` are ever fetched. The first page is
+        kept in the persistent store, if any.
+        """
+        # Walk forward from the last cached page instead of recursing
+        start = number
+        cached = SoundCloudClient._get_page.get_cached
+        while start > 1 and cached(self, url, start - 1) is None:
+            start -= 1
+        for previous in range(start, number):
+            self._get_page(url, previous)
+        collection, next_href = self._get_page(url, number)
+        more = bool(next_href) and number * self.explore_songs < self.max_items
+        return collection, more
 
     @cache(ttl=10)
-    def get_tracks(self, user_id=None):
-        user_url = get_user_url(user_id)
-        tracks = self._get(f"{user_url}/tracks", limit=True)
-        return self.parse_results(tracks)
+    def _get_page(self, url, number):
+        if number <= 1:
+            res = self._get_persistent(
+                f"{url}?limit={self.explore_songs}&linked_partitioning=true"
+            )
+        else:
+            _collection, next_href = self._get_page(url, number - 1)
+            if not next_href:
+                return [], None
+            res = self._get(next_href)
+        if isinstance(res, list):
+            # Endpoint doesn't support linked partitioning
+            return res, None
+        return res.get("collection", []), res.get("next_href")
 
     # Public
-    @cache()
     def get_track(self, track_id, streamable=False):  # noqa: FBT002
+        if streamable:
+            # Signed stream URLs expire, see get_stream_url for their cache
+            return self._fetch_track(track_id, streamable)
+        return self._get_track(track_id)
+
+    @cache(maxsize=4096)
+    def _get_track(self, track_id):
+        return self._fetch_track(track_id)
+
+    def _fetch_track(self, track_id, streamable=False):  # noqa: FBT002
         logger.debug(f"Getting info for track with ID {track_id}")
         try:
             return self.parse_track(self._get(f"tracks/{track_id}"), streamable)
@@ -230,12 +578,72 @@ class SoundCloudClient:
             track = track.uri
         return track.split(".")[-1]
 
-    def search(self, query):
+    def search(self, query, exact=False):  # noqa: FBT002
+        """Searches tracks for a text or a Mopidy query dict
+
+        The fields of a query dict are turned into API filters by
+        :func:`plan_search`, and its requests are made concurrently.
+        """
         # https://developers.soundcloud.com/docs/api/reference#tracks
-        query = quote_plus(query.encode("utf-8"))
-        search_results = self._get(f"tracks?q={query}", limit=True)
-        tracks = [self.parse_track(track, False) for track in search_results]  # noqa: FBT003
-        return self.sanitize_tracks(tracks)
+        if isinstance(query, str):
+            query = quote_plus(query.encode("utf-8"))
+            search_results = self._get(f"tracks?q={query}", limit=True)
+            tracks = [self.parse_track(track, False) for track in search_results]  # noqa: FBT003
+            return self.sanitize_tracks(tracks)
+
+        key = normalize_query(query)
+        results = self.get_search_results(key)
+        tracks = results.wait(timeout=self.http_adapter.retry.request_timeout)
+        if results.failed:
+            # Failed searches are tried again instead of being shared
+            SoundCloudClient.get_search_results.pop_cached(self, key)
+        return rank(tracks, query, exact=exact)
+
+    @cache(ttl=SEARCH_RESULTS_TTL, maxsize=64)
+    def get_search_results(self, key):
+        """Starts a search for a :func:`normalize_query` key
+
+        Identical searches share the results of the first one until it
+        expires.
+        """
+        plans = plan_search(dict(key))
+        logger.debug(f"Searching SoundCloud with {len(plans)} request(s): {plans}")
+        results = SearchResults(self.max_search_results, len(plans))
+        for plan in plans:
+            self.loop.submit(self._search_pages(f"tracks?{urlencode(plan)}", results))
+        return results
+
+    async def _search_pages(self, url, results):
+        """Adds the tracks of each page of search results to ``results``"""
+        first = True
+        try:
+            res = await self._get_async(
+                url, limit=True, params=[("linked_partitioning", "true")]
+            )
+            # _get returns an empty dict if the request failed
+            while res or isinstance(res, list):
+                if isinstance(res, list):
+                    collection, next_href = res, None
+                else:
+                    collection = res.get("collection", [])
+                    next_href = res.get("next_href")
+                # Fetch the next page while parsing this one
+                following = None
+                if next_href and len(collection) < results.budget:
+                    following = asyncio.ensure_future(self._get_async(next_href))
+                results.add(self.sanitize_tracks(map(self.parse_track, collection)))
+                if first:
+                    results.first_page_done()
+                    first = False
+                if following is None or results.full:
+                    if following is not None:
+                        following.cancel()
+                    break
+                res = await following
+        finally:
+            if first:
+                results.first_page_done(failed=True)
+            results.request_done()
 
     def parse_results(self, res):
         tracks = []
@@ -254,16 +662,17 @@ class SoundCloudClient:
     def resolve_url(self, uri):
         return self.parse_results([self._get(f"resolve?url={uri}")])
 
-    def _get(self, url, limit=None):
-        url = f"https://api.soundcloud.com/{url}"
-        params = []
+    def _get(self, url, limit=None, params=()):
+        if not url.startswith(("http://", "https://")):
+            url = f"{self.api_url}{url}"
+        params = list(params)
         if limit:
             params.insert(0, ("limit", self.explore_songs))
         try:
             with closing(self.http_client.get(url, params=params)) as res:
                 logger.debug(f"Requested {res.url}")
                 res.raise_for_status()
-                return res.json()
+                return decode(res.content, get_schema(res.url))
         except Exception as e:  # noqa: BLE001
             if (
                 isinstance(e, HTTPError)
@@ -274,11 +683,45 @@ class SoundCloudClient:
                 logger.error(f"SoundCloud API request failed: {e}")  # noqa: TRY400
         return {}
 
+    async def _get_async(self, url, **kwargs):
+        return await self.loop.run_blocking(self._get, url, **kwargs)
+
+    def _get_persistent(self, url):
+        """Like :meth:`_get`, but serves the first request of a session from
+        the persistent store and revalidates it in the background"""
+        if self.store is None:
+            return self._get(url)
+        if url not in self._revalidated:
+            stored = self.store.get(url)
+            if stored is not None:
+                self._revalidated.add(url)
+                self._background.submit(self._refresh_persistent, url)
+                return stored
+        return self._refresh_persistent(url)
+
+    def _refresh_persistent(self, url):
+        data = self._get(url)
+        # _get returns an empty dict on errors, don't overwrite good data
+        if data and self.store is not None:
+            self.store.set(url, data)
+        self._revalidated.add(url)
+        return data
+
     def sanitize_tracks(self, tracks):
         return [t for t in tracks if t]
 
-    @cache()
-    def parse_track(self, data, remote_url=False):  # noqa: C901, FBT002
+    def index_tracks(self, tracks):
+        """Adds tracks of the user's library to :attr:`search_index`
+
+        Search results aren't added, so that searches for other terms still
+        reach SoundCloud.
+        """
+        tracks = list(tracks)
+        for track in tracks:
+            self.search_index.add(track)
+        return tracks
+
+    def parse_track(self, data, remote_url=False):  # noqa: FBT002
         if not data:
             return None
         if not data.get("streamable"):
@@ -288,9 +731,21 @@ class SoundCloudClient:
             logger.debug(f"{data.get('title')} is not a track")
             return None
 
+        if remote_url:
+            # Signed stream URLs expire, see get_stream_url for their cache
+            return self._build_track(data, remote_url)
+
+        # Records are immutable, so repeated browses can share them
+        key = (data.get("id"), track_fingerprint(data), remote_url)
+        track = self.parsed_tracks.get(key)
+        if track is None:
+            track = self._build_track(data, remote_url)
+            if track is not None:
+                self.parsed_tracks.set(key, track)
+        return track
+
+    def _build_track(self, data, remote_url):
         track_kwargs = {}
-        artist_kwargs = {}
-        album_kwargs = {}
 
         if "title" in data:
             label_name = data.get("label_name")
@@ -298,8 +753,7 @@ class SoundCloudClient:
                 label_name = data.get("user", {}).get("username", "Unknown label")
 
             track_kwargs["name"] = data["title"]
-            artist_kwargs["name"] = label_name
-            album_kwargs["name"] = "SoundCloud"
+            track_kwargs["artist"] = label_name
 
         if "date" in data:
             track_kwargs["date"] = data["date"]
@@ -318,34 +772,89 @@ class SoundCloudClient:
         track_kwargs["length"] = int(data.get("duration", 0))
         track_kwargs["comment"] = data.get("permalink_url", "")
 
-        if artist_kwargs:
-            track_kwargs["artists"] = [Artist(**artist_kwargs)]
-
-        if album_kwargs:
-            track_kwargs["album"] = Album(**album_kwargs)
-
-        return Track(**track_kwargs)
+        return TrackRecord(**track_kwargs)
+
+    def _load_public_client_id(self, store):
+        stored = store.get("public_client_id")
+        if stored:
+            self.public_client_id = stored["client_id"]
+            self.public_client_script = stored["script"]
+            self.public_client_id_updated = stored["updated"]
+
+    def _schedule_public_client_id_refresh(self):
+        if self._client_id_timer is not None:
+            self._client_id_timer.cancel()
+        age = time.time() - self.public_client_id_updated
+        self._client_id_timer = threading.Timer(
+            max(CLIENT_ID_MAX_AGE - age, 0),
+            self._background.submit,
+            [self._update_public_client_id],
+        )
+        self._client_id_timer.daemon = True
+        self._client_id_timer.start()
 
     def _update_public_client_id(self):
-        """Gets a client id which can be used to stream publicly available tracks"""
+        """Gets a client id which can be used to stream publicly available tracks
+
+        Concurrent callers wait for a single scrape of the SoundCloud website.
+        """
+        generation = self._client_id_generation
+        with self._client_id_lock:
+            if generation != self._client_id_generation:
+                return  # Updated by another caller while we waited
+            client_id, script = self._scrape_public_client_id()
+            self.public_client_id = client_id
+            self.public_client_script = script or self.public_client_script
+            self.public_client_id_updated = time.time()
+            self._client_id_generation += 1
+
+        if client_id is None:
+            logger.warning("Failed to update SoundCloud public client id")
+            return
+        logger.debug(f"Updated SoundCloud public client id to: {client_id}")
+        if self.store is not None:
+            self.store.set(
+                "public_client_id",
+                {
+                    "client_id": client_id,
+                    "script": script,
+                    "updated": self.public_client_id_updated,
+                },
+            )
+        self._schedule_public_client_id_refresh()
 
+    def _scrape_public_client_id(self):
         def get_page(url):
             return self.public_stream_client.get(url).content.decode("utf-8")
 
-        public_page = get_page("https://soundcloud.com/")
-        regex_str = r'client_id:"([a-zA-Z0-9]{16,})"'
-        soundcloud_soup = BeautifulSoup(public_page, "html.parser")
-        scripts = soundcloud_soup.find_all("script", attrs={"src": True})
-        self.public_client_id = None
-        for script in scripts:
-            for match in re.finditer(regex_str, get_page(script["src"])):
-                self.public_client_id = match.group(1)
-                logger.debug(
-                    f"Updated SoundCloud public client id to: {self.public_client_id}"
-                )
-                return
+        def find_client_id(script):
+            match = re.search(r'client_id:"([a-zA-Z0-9]{16,})"', get_page(script))
+            return match.group(1) if match else None
+
+        with closing(
+            self.public_stream_client.get("https://soundcloud.com/", stream=True)
+        ) as res:
+            scripts = find_script_sources(res.iter_content(chunk_size=PAGE_CHUNK_SIZE))
+        # Try the bundle which had the client id last time first
+        last_bundle = get_bundle_name(self.public_client_script)
+        scripts.sort(key=lambda script: get_bundle_name(script) != last_bundle)
 
-        logger.warning("Failed to update SoundCloud public client id")
+        pool = ThreadPoolExecutor(max_workers=CLIENT_ID_SCRIPT_WORKERS)
+        try:
+            futures = {
+                pool.submit(find_client_id, script): script for script in scripts
+            }
+            for future in as_completed(futures):
+                try:
+                    client_id = future.result()
+                except Exception as e:  # noqa: BLE001
+                    logger.debug(f"Failed to search {futures[future]}: {e}")
+                    continue
+                if client_id:
+                    return client_id, futures[future]
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return None, None
 
     def _get_public_stream(self, progr_stream):
         params = [("client_id", self.public_client_id)]
@@ -355,23 +864,92 @@ class SoundCloudClient:
     def parse_fail_reason(reason):
         return "" if reason == "Unknown" else f"({reason})"
 
-    @cache()
-    def get_streamable_url(self, sharing, permalink_url, stream_url):  # noqa: C901
+    def get_stream_url(self, track_id):
+        """Returns a playable URL for the track, resolving it if needed"""
+        track_id = str(track_id)
+        url = self.stream_urls.get(track_id)
+        if url is None:
+            url = self._resolve_stream_url_async(track_id).result()
+        return url
+
+    def prefetch_stream_urls(self, track_ids):
+        """Resolves stream URLs in the background for later playback
+
+        ``track_ids`` are the upcoming tracks, in play order. Their URLs are
+        resolved again before they expire for as long as they stay queued,
+        i.e. until the next call leaves them out.
+        """
+        track_ids = list(dict.fromkeys(map(str, track_ids)))
+        with self._stream_lock:
+            self._queued_stream_ids = set(track_ids)
+        for track_id in track_ids:
+            if track_id not in self.stream_urls:
+                self._resolve_stream_url_async(track_id, prefetch=True)
+
+    def _resolve_stream_url_async(self, track_id, prefetch=False):  # noqa: FBT002
+        with self._stream_lock:
+            future = self._stream_futures.get(track_id)
+            if future is None:
+                if prefetch:
+                    coro = self._prefetch_stream_url(track_id)
+                else:
+                    coro = self.loop.run_blocking(self._resolve_stream_url, track_id)
+                future = self.loop.submit(coro)
+                self._stream_futures[track_id] = future
+                future.add_done_callback(lambda _: self._forget_stream_future(track_id))
+        return future
+
+    async def _prefetch_stream_url(self, track_id):
+        async with self._prefetch_slots:
+            return await self.loop.run_blocking(self._resolve_stream_url, track_id)
+
+    def _refresh_stream_url(self, track_id):
+        with self._stream_lock:
+            if track_id not in self._queued_stream_ids:
+                return
+        logger.debug(f"Refreshing stream URL for queued track with ID {track_id}")
+        self._resolve_stream_url_async(track_id, prefetch=True)
+
+    def _forget_stream_future(self, track_id):
+        with self._stream_lock:
+            self._stream_futures.pop(track_id, None)
+
+    def _resolve_stream_url(self, track_id):
+        logger.debug(f"Resolving stream URL for track with ID {track_id}")
+        try:
+            track = self.parse_track(self._get(f"tracks/{track_id}"), True)  # noqa: FBT003
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"Failed to resolve stream for track {track_id}: {e}")  # noqa: TRY400
+            return None
+        if track is None:
+            return None
+
+        ttl = STREAM_URL_TTL
+        expiry = get_url_expiry(track.uri)
+        if expiry is not None:
+            ttl = expiry - time.time() - STREAM_URL_EXPIRY_MARGIN
+        if ttl > 0:
+            self.stream_urls.set(track_id, track.uri, ttl=ttl)
+            with self._stream_lock:
+                queued = track_id in self._queued_stream_ids
+            if queued:
+                delay = max(ttl - STREAM_URL_REFRESH_AHEAD, 0)
+                self.loop.call_later(delay, self._refresh_stream_url, track_id)
+        return track.uri
+
+    def get_streamable_url(self, sharing, permalink_url, stream_url):
         if self.public_client_id is None:
             self._update_public_client_id()
 
         progressive_urls = {}
         if sharing == "public" and self.public_client_id is not None:
-            res = self.public_stream_client.get(permalink_url)
-
-            for html_substring in res.text.split('"'):
-                if html_substring.endswith("preview/progressive"):
-                    progressive_urls["preview"] = html_substring
-                elif html_substring.endswith("stream/progressive"):
-                    progressive_urls["stream"] = html_substring
-
-                if progressive_urls.get("preview") and progressive_urls.get("stream"):
-                    break
+            with closing(
+                self.public_stream_client.get(permalink_url, stream=True)
+            ) as res:
+                # Closing the response drops the rest of the page
+                progressive_urls = find_progressive_urls(
+                    res.iter_content(chunk_size=PAGE_CHUNK_SIZE)
+                )
 
             if progressive_urls.get("stream"):
                 stream = self._get_public_stream(progressive_urls["stream"])
@@ -408,12 +986,43 @@ class SoundCloudClient:
         return None
 
     def resolve_tracks(self, track_ids):
-        """Resolve tracks concurrently emulating browser
+        """Resolve tracks in batches, reusing already fetched tracks
 
         :param track_ids:list of track ids
-        :return:list `Track`
+        :return:list `TrackRecord` in the order of `track_ids`
         """
-        pool = ThreadPool(processes=16)
-        tracks = pool.map(self.get_track, track_ids)
-        pool.close()
-        return self.sanitize_tracks(tracks)
+        track_ids = [str(track_id) for track_id in track_ids]
+        tracks = {}
+        missing = []
+        for track_id in dict.fromkeys(track_ids):
+            track = SoundCloudClient._get_track.get_cached(self, track_id)
+            if track is None:
+                missing.append(track_id)
+            else:
+                tracks[track_id] = track
+
+        for batch in self.loop.run(self._get_track_batches(missing)):
+            if isinstance(batch, dict):
+                batch = batch.get("collection", [])  # noqa: PLW2901
+            for data in batch:
+                track = self.parse_track(data)
+                if track is not None:
+                    track_id = str(data["id"])
+                    tracks[track_id] = track
+                    SoundCloudClient._get_track.set_cached(self, track_id, value=track)
+
+        return self.sanitize_tracks([tracks.get(track_id) for track_id in track_ids])
+
+    async def _get_track_batches(self, track_ids):
+        """Requests all batches of ``track_ids`` at once"""
+        batches = [
+            track_ids[i : i + TRACK_BATCH_SIZE]
+            for i in range(0, len(track_ids), TRACK_BATCH_SIZE)
+        ]
+        logger.debug(f"Getting info for {len(track_ids)} tracks")
+        return await asyncio.gather(
+            *(
+                self._get_async("tracks", params=[("ids", ",".join(batch))])
+                for batch in batches
+            )
+        )
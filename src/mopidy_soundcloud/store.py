@@ -0,0 +1,76 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataStore:
+    """SQLite backed store of API responses that survives Mopidy restarts.
+
+    Values are stored as JSON documents keyed by their API path, so they can
+    be parsed again with :meth:`SoundCloudClient.parse_track` and friends.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "url TEXT PRIMARY KEY, body TEXT NOT NULL, updated REAL NOT NULL)"
+            )
+
+    def __contains__(self, url):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        return row is not None
+
+    def get(self, url, default=None):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return default
+        try:
+            return json.loads(row[0])
+        except ValueError:
+            logger.warning(f"Discarding corrupt SoundCloud cache entry for {url}")
+            return default
+
+    def set(self, url, value):
+        body = json.dumps(value, separators=(",", ":"))
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO responses (url, body, updated) "
+                    "VALUES (?, ?, ?)",
+                    (url, body, time.time()),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to persist SoundCloud response for {url}: {e}")
+
+    def prune(self, max_bytes):
+        """Deletes the least recently updated responses until the stored
+        bodies take up no more than ``max_bytes``"""
+        try:
+            with self._lock, self._connection:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE url IN ("
+                    "SELECT url FROM (SELECT url, SUM(LENGTH(CAST(body AS BLOB))) "
+                    "OVER (ORDER BY updated DESC, url) AS total FROM responses) "
+                    "WHERE total > ?)",
+                    (max_bytes,),
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to prune SoundCloud cache {self.path}: {e}")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,15 @@
+import configparser
+
+from mopidy_soundcloud import Extension
+
+
+def get_config(**values):
+    """Returns a config with the defaults from ``ext.conf`` and ``values``"""
+    ext = Extension()
+    parser = configparser.RawConfigParser()
+    parser.read_string(ext.get_default_config())
+    config, _errors = ext.get_config_schema().deserialize(
+        dict(parser.items("soundcloud"))
+    )
+    config.update(values)
+    return {"soundcloud": config, "proxy": {}}
@@ -0,0 +1,183 @@
+"""Timings of the hot paths the extension optimizes, against the code or
+library they replaced
+
+Run from the repository root with ``python -m tests.benchmark``. Every
+timing is the best of a few runs, so that they are comparable between runs.
+"""
+
+import gzip
+import importlib.util
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import yaml
+
+from mopidy_soundcloud import decoding
+from mopidy_soundcloud.decoding import ActivityPage, Resource, decode
+from mopidy_soundcloud.soundcloud import (
+    PAGE_CHUNK_SIZE,
+    find_progressive_urls,
+    find_script_sources,
+)
+from tests.test_decoding import large_set, large_stream
+
+REPEAT = 5
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def best_time(func, *args):
+    """Returns the fastest of :data:`REPEAT` runs of ``func(*args)``, in ms"""
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def peak_memory(func, *args):
+    """Returns the peak memory allocated by ``func(*args)``, in MB"""
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def permalink_page():
+    """A track page of about 540 KB with the progressive URLs in its first
+    third, like the script data of real pages"""
+    media = "https://api-v2.soundcloud.com/media/soundcloud:tracks:1"
+    filler = '<div class="sound" data-x="y">Recorded live</div>' * 3600
+    urls = (
+        f'{{"url":"{media}/a/preview/progressive",'
+        f'"url":"{media}/b/stream/progressive"}}'
+    )
+    return f"<html>{filler}<script>{urls}</script>{filler * 2}</html>".encode()
+
+
+def split_whole_page(page):
+    """Scan of permalink pages before they were read incrementally"""
+    urls = {}
+    for piece in page.decode().split('"'):
+        if piece.endswith("preview/progressive"):
+            urls["preview"] = piece
+        elif piece.endswith("stream/progressive"):
+            urls["stream"] = piece
+        if "preview" in urls and "stream" in urls:
+            break
+    return urls
+
+
+def scan_chunks(page):
+    chunks = (
+        page[i : i + PAGE_CHUNK_SIZE] for i in range(0, len(page), PAGE_CHUNK_SIZE)
+    )
+    return find_progressive_urls(chunks)
+
+
+def bench_permalink_scan():
+    page = permalink_page()
+    assert scan_chunks(page) == split_whole_page(page)
+    for name, func in (
+        ("incrementally", scan_chunks),
+        ("whole page", split_whole_page),
+    ):
+        print(
+            f"permalink page ({len(page) / 1e3:.0f} KB) {name}: "
+            f"{best_time(func, page):.1f} ms, {peak_memory(func, page):.1f} MB peak"
+        )
+
+
+def import_time(module):
+    """Returns the time importing ``module`` takes in a fresh interpreter,
+    with the modules it imports, in ms"""
+    timings = []
+    for _ in range(REPEAT):
+        result = subprocess.run(  # noqa: S603
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for line in result.stderr.splitlines():
+            _self, cumulative, name = line.removeprefix("import time:").split("|")
+            if name.strip() == module:
+                timings.append(int(cumulative) / 1000)
+    return min(timings)
+
+
+def homepage():
+    """The SoundCloud homepage recorded in a cassette, about 13 KB"""
+    cassette = yaml.safe_load((FIXTURES / "sc-resolve-app-client-id.yaml").read_text())
+    for interaction in cassette["interactions"]:
+        if interaction["request"]["uri"] == "https://soundcloud.com/":
+            return gzip.decompress(interaction["response"]["body"]["string"])
+    msg = "Homepage missing from cassette"
+    raise LookupError(msg)
+
+
+def parse_script_sources(page):
+    chunks = (
+        page[i : i + PAGE_CHUNK_SIZE] for i in range(0, len(page), PAGE_CHUNK_SIZE)
+    )
+    return find_script_sources(chunks)
+
+
+def soup_script_sources(page):
+    """Script extraction before BeautifulSoup was dropped"""
+    from bs4 import BeautifulSoup  # noqa: PLC0415
+
+    soup = BeautifulSoup(page, "html.parser")
+    return [script["src"] for script in soup.find_all("script", attrs={"src": True})]
+
+
+def bench_script_sources():
+    page = homepage()
+    print(
+        f"script sources of homepage ({len(page) / 1e3:.0f} KB): "
+        f"{best_time(parse_script_sources, page):.1f} ms with html.parser"
+    )
+    if importlib.util.find_spec("bs4") is None:
+        print("script sources with BeautifulSoup: skipped, bs4 is not installed")
+    else:
+        assert soup_script_sources(page) == parse_script_sources(page)
+        print(
+            f"script sources with BeautifulSoup: "
+            f"{best_time(soup_script_sources, page):.1f} ms, "
+            f"importing bs4 takes {import_time('bs4'):.1f} ms"
+        )
+    module = "mopidy_soundcloud.soundcloud"
+    print(f"importing {module} takes {import_time(module):.1f} ms")
+
+
+def bench_decoding():
+    if decoding.msgspec is None:
+        print("decoding: skipped, msgspec is not installed")
+        return
+    for name, content, schema in (
+        ("large set", large_set().encode(), Resource),
+        ("large stream", large_stream().encode(), ActivityPage),
+    ):
+        stdlib = best_time(json.loads, content)
+        fast = best_time(decode, content, schema)
+        print(
+            f"decoding {name} ({len(content) / 1e6:.1f} MB): "
+            f"{fast:.1f} ms with schema, {stdlib:.1f} ms with json.loads"
+        )
+
+
+def main():
+    bench_decoding()
+    bench_permalink_scan()
+    bench_script_sources()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import unittest
+
+from mopidy_soundcloud.activities import ActivityRing
+
+
+def track(track_id):
+    return {"kind": "track", "id": track_id}
+
+
+class ActivityRingTest(unittest.TestCase):
+    def setUp(self):
+        self.ring = ActivityRing(maxsize=3)
+
+    def test_merges_newest_first(self):
+        self.ring.merge([track(2), track(1)], cursor="c1")
+        self.ring.merge([track(4), track(3)], cursor="c2")
+        assert [o["id"] for o in self.ring] == [4, 3, 2]
+        assert self.ring.cursor == "c2"
+
+    def test_moves_known_origins_to_front(self):
+        self.ring.merge([track(2), track(1)])
+        self.ring.merge([track(1)])
+        assert [o["id"] for o in self.ring] == [1, 2]
+        assert len(self.ring) == 2
+
+    def test_playlists_and_tracks_with_same_id_are_distinct(self):
+        self.ring.merge([track(1), {"kind": "playlist", "id": 1}])
+        assert len(self.ring) == 2
+
+    def test_version_changes_only_with_new_origins(self):
+        self.ring.merge([track(1)], cursor="c1")
+        version = self.ring.version
+        self.ring.merge([], cursor="c2")
+        assert self.ring.version == version
+        assert self.ring.cursor == "c2"
+
+    def test_round_trips_through_json(self):
+        self.ring.merge([track(2), track(1)], cursor="c1")
+        ring = ActivityRing(maxsize=3)
+        ring.load(self.ring.to_json())
+        assert list(ring) == list(self.ring)
+        assert ring.cursor == "c1"
+
+    def test_contains_known_origins(self):
+        self.ring.merge([track(1)])
+        assert {"kind": "track", "id": 1, "title": "Changed"} in self.ring
+        assert {"kind": "playlist", "id": 1} not in self.ring
@@ -1,32 +1,70 @@
+import threading
+import time
 import unittest
 from pathlib import Path
 from unittest import mock
+from urllib.parse import parse_qsl, urlencode, urlparse
 
 import vcr
 from mopidy.models import Track
 
 import mopidy_soundcloud
-from mopidy_soundcloud import Extension
-from mopidy_soundcloud.soundcloud import SoundCloudClient, readable_url
+from mopidy_soundcloud.query import normalize_query
+from mopidy_soundcloud.records import TrackRecord
+from mopidy_soundcloud.soundcloud import (
+    STREAM_PREFETCH_WORKERS,
+    STREAM_URL_EXPIRY_MARGIN,
+    STREAM_URL_REFRESH_AHEAD,
+    SoundCloudClient,
+    find_progressive_urls,
+    find_script_sources,
+    get_bundle_name,
+    get_url_expiry,
+    readable_url,
+)
+from tests import get_config
 
 local_path = Path(__file__).parent.resolve()
+
+
+def uri_without_linked_partitioning(r1, r2):
+    # The cassettes were recorded before collections were requested with
+    # linked partitioning, so the parameter is left out when matching
+    def strip(uri):
+        url = urlparse(uri)
+        query = [
+            (key, value)
+            for key, value in parse_qsl(url.query)
+            if key != "linked_partitioning"
+        ]
+        return url._replace(query=urlencode(query)).geturl()
+
+    assert strip(r1.uri) == strip(r2.uri)
+
+
 my_vcr = vcr.VCR(
     serializer="yaml",
     cassette_library_dir=str(local_path / "fixtures"),
     record_mode="once",
-    match_on=["uri", "method"],
+    match_on=["uri_without_linked_partitioning", "method"],
     decode_compressed_response=True,
     filter_headers=["Authorization"],
 )
+my_vcr.register_matcher(
+    "uri_without_linked_partitioning", uri_without_linked_partitioning
+)
 
 
 class ApiTest(unittest.TestCase):
     @my_vcr.use_cassette("sc-login.yaml")
     def setUp(self):
-        config = Extension().get_config_schema()
-        config["auth_token"] = "3-35204-970067440-lVY4FovkEcKrEGw"  # noqa: S105
-        config["explore_songs"] = 10
-        self.api = SoundCloudClient({"soundcloud": config, "proxy": {}})
+        config = get_config(
+            auth_token="3-35204-970067440-lVY4FovkEcKrEGw",  # noqa: S106
+            explore_songs=10,
+            max_items=10,
+        )
+        self.api = SoundCloudClient(config)
+        self.addCleanup(self.api.close)
 
     def test_sets_user_agent(self):
         agent = f"mopidy-soundcloud/{mopidy_soundcloud.__version__} Mopidy/"
@@ -43,9 +81,8 @@ class ApiTest(unittest.TestCase):
     @my_vcr.use_cassette("sc-login-error.yaml")
     def test_responds_with_error(self):
         with mock.patch("mopidy_soundcloud.soundcloud.logger.error") as d:
-            config = Extension().get_config_schema()
-            config["auth_token"] = "1-fake-token"  # noqa: S105
-            _ = SoundCloudClient({"soundcloud": config, "proxy": {}}).user
+            config = get_config(auth_token="1-fake-token")  # noqa: S106
+            _ = SoundCloudClient(config).user
             d.assert_called_once_with(
                 'Invalid "auth_token" used for SoundCloud authentication!'
             )
@@ -72,13 +109,27 @@ class ApiTest(unittest.TestCase):
     @my_vcr.use_cassette("sc-resolve-track.yaml")
     def test_resolves_track(self):
         track = self.api.get_track("13158665")
-        assert isinstance(track, Track)
+        assert isinstance(track, TrackRecord)
         assert track.uri == "soundcloud:song/Munching at Tiannas house.13158665"
 
+    @my_vcr.use_cassette("sc-resolve-track.yaml")
+    def test_get_track_is_cached_per_client(self):
+        self.api.get_track("13158665")
+        self.api.get_track("13158665")
+        stats = self.api.cache_stats()["_get_track"]
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_get_track_with_stream_url_is_not_cached(self):
+        self.api._get = mock.Mock(return_value={})
+        self.api.get_track("13158665", True)  # noqa: FBT003
+        self.api.get_track("13158665", True)  # noqa: FBT003
+        assert self.api._get.call_count == 2
+
     @my_vcr.use_cassette("sc-resolve-http.yaml")
     def test_resolves_http_url(self):
         track = self.api.resolve_url("https://soundcloud.com/bbc-radio-4/m-w-cloud")[0]
-        assert isinstance(track, Track)
+        assert isinstance(track, TrackRecord)
         assert (
             track.uri
             == "soundcloud:song/That Mitchell and Webb Sound The Cloud.122889665"
@@ -97,7 +148,7 @@ class ApiTest(unittest.TestCase):
         )
         assert len(tracks) == 4
         for i, _ in enumerate(expected_tracks):
-            assert isinstance(tracks[i], Track)
+            assert isinstance(tracks[i], TrackRecord)
             assert tracks[i].name == expected_tracks[i]
             assert tracks[i].length > 500
             assert len(tracks[i].artists) == 1
@@ -105,27 +156,140 @@ class ApiTest(unittest.TestCase):
 
     @my_vcr.use_cassette("sc-liked.yaml")
     def test_get_user_likes(self):
-        tracks = self.api.get_likes()
+        tracks, _more = self.api.get_likes_page(1)
         assert len(tracks) == 3
-        assert isinstance(tracks[0], Track)
+        assert isinstance(tracks[0], TrackRecord)
         assert tracks[1].name == "Pelican - Deny The Absolute"
 
     @my_vcr.use_cassette("sc-stream.yaml")
     def test_get_user_stream(self):
         tracks = self.api.get_user_stream()
         assert len(tracks) == 10
-        assert isinstance(tracks[0], Track)
+        assert isinstance(tracks[0], TrackRecord)
         assert tracks[2].name == "JW Ep 20- Jeremiah Watkins"
 
+    @my_vcr.use_cassette("sc-stream.yaml")
+    def test_get_user_stream_fetches_only_new_activities(self):
+        tracks = self.api.get_user_stream()
+        cursor = self.api.activities.cursor
+        assert cursor.startswith("https://api.soundcloud.com/me/activities?uuid")
+
+        new = {"kind": "track", "id": 1, "title": "New", "streamable": True}
+        self.api._get = mock.Mock(
+            return_value={
+                "collection": [{"origin": new}, {"origin": None}],
+                "future_href": "https://api.soundcloud.com/next-cursor",
+            }
+        )
+        SoundCloudClient.get_user_stream.cache_clear(self.api)
+        updated = self.api.get_user_stream()
+
+        self.api._get.assert_called_once_with(cursor)
+        assert self.api.activities.cursor == "https://api.soundcloud.com/next-cursor"
+        # The ring holds max_items activities, so the oldest one is dropped
+        assert [track.name for track in updated] == [
+            "New",
+            *(track.name for track in tracks[:-1]),
+        ]
+
+    @my_vcr.use_cassette("sc-stream.yaml")
+    def test_get_user_stream_stops_at_known_activities(self):
+        tracks = self.api.get_user_stream()
+        cursor = self.api.activities.cursor
+        known = self.api.activities.to_json()["origins"][0]
+
+        new = {"kind": "track", "id": 1, "title": "New", "streamable": True}
+        older = {"kind": "track", "id": 2, "title": "Older", "streamable": True}
+        pages = {
+            cursor: {
+                "collection": [{"origin": new}],
+                "future_href": "https://api.soundcloud.com/next-cursor",
+                "next_href": "https://api.soundcloud.com/older?1",
+            },
+            "https://api.soundcloud.com/older?1": {
+                "collection": [{"origin": older}, {"origin": known}],
+                "next_href": "https://api.soundcloud.com/older?2",
+            },
+        }
+        self.api._get = mock.Mock(side_effect=lambda url, **_kwargs: pages[url])
+        SoundCloudClient.get_user_stream.cache_clear(self.api)
+        updated = self.api.get_user_stream()
+
+        assert [c.args[0] for c in self.api._get.call_args_list] == [
+            cursor,
+            "https://api.soundcloud.com/older?1",
+        ]
+        assert [track.name for track in updated[:3]] == [
+            "New",
+            "Older",
+            tracks[0].name,
+        ]
+
+    @my_vcr.use_cassette("sc-stream.yaml")
+    def test_get_user_stream_ignores_next_href_without_new_activities(self):
+        self.api.get_user_stream()
+        self.api._get = mock.Mock(
+            return_value={
+                "collection": [],
+                "future_href": "c",
+                "next_href": "https://api.soundcloud.com/older",
+            }
+        )
+        SoundCloudClient.get_user_stream.cache_clear(self.api)
+        self.api.get_user_stream()
+        self.api._get.assert_called_once()
+
+    @my_vcr.use_cassette("sc-stream.yaml")
+    def test_get_user_stream_reuses_tracks_without_new_activities(self):
+        tracks = self.api.get_user_stream()
+        self.api._get = mock.Mock(return_value={"collection": [], "future_href": "c"})
+        SoundCloudClient.get_user_stream.cache_clear(self.api)
+        assert self.api.get_user_stream() is tracks
+
+    @my_vcr.use_cassette("sc-stream.yaml")
+    def test_get_user_stream_persists_activities_only_when_changed(self):
+        self.api.store = mock.Mock()
+        self.api.store.get.return_value = {}
+        self.api.get_user_stream()
+        cursor = self.api.activities.cursor
+        self.api.store.set.assert_called_once()
+
+        self.api._get = mock.Mock(
+            return_value={"collection": [], "future_href": cursor}
+        )
+        SoundCloudClient.get_user_stream.cache_clear(self.api)
+        self.api.get_user_stream()
+        self.api.store.set.assert_called_once()
+
+    @my_vcr.use_cassette("sc-stream.yaml")
+    def test_get_user_stream_keeps_activities_when_sync_fails(self):
+        tracks = self.api.get_user_stream()
+        cursor = self.api.activities.cursor
+        self.api._get = mock.Mock(return_value={})
+        SoundCloudClient.get_user_stream.cache_clear(self.api)
+        assert self.api.get_user_stream() == tracks
+        assert self.api.activities.cursor == cursor
+
     @my_vcr.use_cassette("sc-following.yaml")
     def test_get_followings(self):
-        users = self.api.get_followings()
+        users, _more = self.api.get_followings_page(1)
         assert len(users) == 10
         assert users[0] == ("Young Legionnaire", "992503")
         assert users[1] == ("Tall Ships", "1710483")
         assert users[8] == ("Pelican Song", "27945548")
         assert users[9] == ("sleepmakeswaves", "1739693")
 
+    def test_page_follows_next_href(self):
+        pages = {
+            "me/favorites?limit=10&linked_partitioning=true": {
+                "collection": [1, 2],
+                "next_href": "https://next",
+            },
+            "https://next": {"collection": [3]},
+        }
+        self.api._get = mock.Mock(side_effect=lambda url, **_kwargs: pages[url])
+        assert self.api.get_page("me/favorites", 2) == ([3], False)
+
     @my_vcr.use_cassette("sc-user-tracks.yaml")
     def test_get_user_tracks(self):
         expected_tracks = [
@@ -141,9 +305,9 @@ class ApiTest(unittest.TestCase):
             "Pelican - Strung Up From The Sky",
         ]
 
-        tracks = self.api.get_tracks(27945548)
+        tracks, _more = self.api.get_tracks_page(1, 27945548)
         for i, _ in enumerate(expected_tracks):
-            assert isinstance(tracks[i], Track)
+            assert isinstance(tracks[i], TrackRecord)
             assert tracks[i].name == expected_tracks[i]
             assert tracks[i].length > 500
             assert len(tracks[i].artists) == 1
@@ -161,13 +325,148 @@ class ApiTest(unittest.TestCase):
 
     @my_vcr.use_cassette("sc-sets.yaml")
     def test_get_sets(self):
-        sets = self.api.get_sets()
+        sets, _more = self.api.get_sets_page(1)
         assert len(sets) == 2
         name, set_id, tracks = sets[1]
         assert name == "Pelican"
         assert set_id == "10961826"
         assert len(tracks) == 1
 
+    def test_set_is_served_from_the_sets_listing(self):
+        playlist = {
+            "title": "Set",
+            "id": 7,
+            "track_count": 3,
+            "tracks": [
+                {"kind": "track", "id": 1, "title": "One", "streamable": True},
+                {"kind": "track", "id": 2},
+                {"kind": "track", "id": 3, "title": "Three", "streamable": False},
+            ],
+        }
+        self.api._get = mock.Mock(return_value={"collection": [playlist]})
+        self.api.get_sets_page(1)
+        self.api.explore_songs = 1
+        self.api.resolve_tracks = mock.Mock(
+            return_value=[TrackRecord("soundcloud:song/Two.2", name="Two")]
+        )
+
+        tracks, more = self.api.get_set_page("7", 1)
+        assert [track.name for track in tracks] == ["One"]
+        assert more is True
+        self.api.resolve_tracks.assert_not_called()
+
+        tracks, more = self.api.get_set_page("7", 2)
+        assert [track.name for track in tracks] == ["Two"]
+        self.api.resolve_tracks.assert_called_once_with(["2"])
+
+        tracks, more = self.api.get_set_page("7", 3)
+        assert tracks == []
+        assert more is False
+        self.api._get.assert_called_once()
+
+    def test_truncated_set_is_resolved_page_by_page(self):
+        playlist = {
+            "title": "Set",
+            "id": 9,
+            "track_count": 4,
+            "tracks": [{"kind": "track", "id": i} for i in range(1, 5)],
+        }
+        self.api._get = mock.Mock(return_value={"collection": [playlist]})
+        self.api.get_sets_page(1)
+        self.api.explore_songs = 2
+        self.api.resolve_tracks = mock.Mock(
+            side_effect=lambda ids: [
+                TrackRecord(f"soundcloud:song/T{i}.{i}", name=f"T{i}") for i in ids
+            ]
+        )
+
+        tracks, more = self.api.get_set_page("9", 1)
+        assert [track.name for track in tracks] == ["T1", "T2"]
+        assert more is True
+
+        tracks, more = self.api.get_set_page("9", 2)
+        assert [track.name for track in tracks] == ["T3", "T4"]
+        assert more is False
+        assert self.api.resolve_tracks.call_args_list == [
+            mock.call(["1", "2"]),
+            mock.call(["3", "4"]),
+        ]
+
+    def test_relisting_sets_keeps_resolved_tracks(self):
+        playlist = {
+            "title": "Set",
+            "id": 9,
+            "track_count": 2,
+            "tracks": [{"kind": "track", "id": i} for i in (1, 2)],
+        }
+        self.api._get = mock.Mock(return_value={"collection": [playlist]})
+        self.api.resolve_tracks = mock.Mock(
+            side_effect=lambda ids: [
+                TrackRecord(f"soundcloud:song/T{i}.{i}", name=f"T{i}") for i in ids
+            ]
+        )
+
+        self.api.get_sets_page(1)
+        self.api.get_set_page("9", 1)
+        SoundCloudClient._get_page.cache_clear(self.api)
+        self.api.get_sets_page(1)
+        tracks, _more = self.api.get_set_page("9", 1)
+
+        assert [track.name for track in tracks] == ["T1", "T2"]
+        assert self.api._get.call_count == 2
+        self.api.resolve_tracks.assert_called_once_with(["1", "2"])
+
+    def test_set_left_out_of_listing_is_fetched(self):
+        self.api._get = mock.Mock(
+            return_value={"collection": [{"title": "Set", "id": 7, "track_count": 2}]}
+        )
+        self.api.get_sets_page(1)
+        self.api._get_persistent = mock.Mock(
+            return_value={
+                "tracks": [
+                    {"kind": "track", "id": i, "title": f"T{i}", "streamable": True}
+                    for i in range(2)
+                ]
+            }
+        )
+
+        tracks, more = self.api.get_set_page("7", 1)
+        assert [track.name for track in tracks] == ["T0", "T1"]
+        assert more is False
+        self.api._get_persistent.assert_called_once_with("playlists/7")
+
+    def test_warm_up_loads_first_pages_of_listings(self):
+        self.api._get = mock.Mock(return_value={"collection": []})
+        self.api.get_user_stream = mock.Mock()
+        self.api._warm_up()
+
+        self.api.get_followings_page(1)
+        self.api.get_sets_page(1)
+        self.api.get_likes_page(1)
+        assert self.api._get.call_count == 3
+        self.api.get_user_stream.assert_called_once_with()
+
+    def test_warm_up_gets_public_client_id_without_store(self):
+        self.api._background = mock.Mock()
+        self.api.warm_up()
+        self.api._background.submit.assert_called_once_with(
+            self.api._update_public_client_id
+        )
+
+    def test_persistent_store_serves_first_request(self):
+        self.api.store = mock.Mock()
+        self.api.store.get.return_value = [{"id": 1}]
+        self.api._background = mock.Mock()
+        assert self.api._get_persistent("playlists/1") == [{"id": 1}]
+        self.api.store.get.assert_called_once_with("playlists/1")
+        self.api._background.submit.assert_called_once()
+
+    def test_persistent_store_keeps_data_on_error(self):
+        self.api.store = mock.Mock()
+        self.api._get = mock.Mock(return_value={})
+        self.api._refresh_persistent("me")
+        self.api.store.set.assert_not_called()
+
     def test_readeble_url(self):
         assert readable_url('"@"Barsuk      Records') == "Barsuk Records"
         assert readable_url("_Barsuk 'Records'") == "_Barsuk Records"
@@ -176,7 +475,7 @@ class ApiTest(unittest.TestCase):
     def test_resolves_stream_track(self):
         self.api._update_public_client_id = mock.Mock()
         track = self.api.get_track("13158665", True)  # noqa: FBT003
-        assert isinstance(track, Track)
+        assert isinstance(track, TrackRecord)
         assert track.uri == (
             "https://cf-media.sndcdn.com/fxguEjG4ax6B.128.mp3?Policy="
             "eyJTdGF0ZW1lbnQiOlt7IlJlc291cmNlIjoiKjovL2NmLW1lZGlhLnNu"
@@ -192,6 +491,221 @@ class ApiTest(unittest.TestCase):
             "M5DG6EPQ"
         )
 
+    def test_signed_url_expiry(self):
+        url = (
+            "https://cf-media.sndcdn.com/fxguEjG4ax6B.128.mp3?Policy="
+            "eyJTdGF0ZW1lbnQiOlt7IlJlc291cmNlIjoiKjovL2NmLW1lZGlhLnNu"
+            "ZGNkbi5jb20vZnhndUVqRzRheDZCLjEyOC5tcDMqIiwiQ29uZGl0aW9u"
+            "Ijp7IkRhdGVMZXNzVGhhbiI6eyJBV1M6RXBvY2hUaW1lIjoxNjUxNzky"
+            "Mzg1fX19XX0_&Signature=OGBst0oQOjHEf3TnH7IJ"
+        )
+        assert get_url_expiry(url) == 1651792385
+        assert get_url_expiry("https://example.com/a.mp3?Expires=42") == 42
+        assert get_url_expiry("https://example.com/a.mp3") is None
+
+    def test_finds_progressive_urls_across_chunks(self):
+        page = (
+            b'<html><script>{"url":"https://api-v2.soundcloud.com/media/'
+            b'soundcloud:tracks:1/a/preview/progressive","x":"y","url":'
+            b'"https://api-v2.soundcloud.com/media/soundcloud:tracks:1/b/'
+            b'stream/progressive"}</script></html>'
+        )
+        chunks = [page[i : i + 7] for i in range(0, len(page), 7)]
+        assert find_progressive_urls(chunks) == {
+            "preview": "https://api-v2.soundcloud.com/media/"
+            "soundcloud:tracks:1/a/preview/progressive",
+            "stream": "https://api-v2.soundcloud.com/media/"
+            "soundcloud:tracks:1/b/stream/progressive",
+        }
+
+    def test_stops_reading_page_when_urls_found(self):
+        head = b'"https://a/preview/progressive" "https://a/stream/progressive"'
+        page = head + b' "filler"' * 100_000
+        read = []
+
+        def chunks():
+            for i in range(0, len(page), 1024):
+                read.append(i)
+                yield page[i : i + 1024]
+
+        assert len(find_progressive_urls(chunks())) == 2
+        assert len(read) == 1
+
+    def mock_public_pages(self, pages):
+        def get(url, **_kwargs):
+            page = pages[url].encode()
+            return mock.Mock(content=page, iter_content=lambda **_: [page])
+
+        self.api.public_stream_client = mock.Mock()
+        self.api.public_stream_client.get.side_effect = get
+
+    def test_scrapes_public_client_id(self):
+        self.mock_public_pages(
+            {
+                "https://soundcloud.com/": (
+                    '<script src="https://a-v2.sndcdn.com/assets/1-aaa.js"></script>'
+                    '<script src="https://a-v2.sndcdn.com/assets/49-bbb.js"></script>'
+                ),
+                "https://a-v2.sndcdn.com/assets/1-aaa.js": "var a=1",
+                "https://a-v2.sndcdn.com/assets/49-bbb.js": (
+                    'e={client_id:"PMINl7wzKHg40zDFBjAeIgMPWO4Dpw8M"}'
+                ),
+            }
+        )
+        self.api.store = mock.Mock()
+        self.api._client_id_timer = mock.Mock()
+        self.api._schedule_public_client_id_refresh = mock.Mock()
+
+        self.api._update_public_client_id()
+
+        assert self.api.public_client_id == "PMINl7wzKHg40zDFBjAeIgMPWO4Dpw8M"
+        assert self.api.public_client_script.endswith("49-bbb.js")
+        stored = self.api.store.set.call_args.args[1]
+        assert stored["client_id"] == "PMINl7wzKHg40zDFBjAeIgMPWO4Dpw8M"
+        self.api._schedule_public_client_id_refresh.assert_called_once()
+
+    def test_public_client_id_is_scraped_once_for_concurrent_callers(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def scrape():
+            started.set()
+            release.wait(5)
+            return "PMINl7wzKHg40zDFBjAeIgMPWO4Dpw8M", None
+
+        self.api._scrape_public_client_id = mock.Mock(side_effect=scrape)
+        self.api._schedule_public_client_id_refresh = mock.Mock()
+        first = threading.Thread(target=self.api._update_public_client_id)
+        first.start()
+        started.wait(5)
+        second = threading.Thread(target=self.api._update_public_client_id)
+        second.start()
+        time.sleep(0.1)  # Let the second caller queue up behind the first
+        release.set()
+        first.join()
+        second.join()
+
+        self.api._scrape_public_client_id.assert_called_once()
+
+    def test_concurrent_get_track_calls_share_one_request(self):
+        release = threading.Event()
+
+        def get(url):
+            release.wait(5)
+            return {"kind": "track", "id": 1, "title": "Munching", "streamable": True}
+
+        self.api._get = mock.Mock(side_effect=get)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(self.api.get_track(1)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)  # Let all callers queue up behind the first
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.api._get.assert_called_once_with("tracks/1")
+        assert len(results) == 8
+        assert results[0] is not None
+        assert all(track is results[0] for track in results)
+
+    @my_vcr.use_cassette("sc-resolve-app-client-id.yaml")
+    def test_finds_script_sources_in_homepage(self):
+        res = self.api.public_stream_client.get("https://soundcloud.com/", stream=True)
+        scripts = find_script_sources(res.iter_content(chunk_size=512))
+        assert scripts == [
+            "https://a-v2.sndcdn.com/assets/14-d8c9d717.js",
+            "https://a-v2.sndcdn.com/assets/49-7141e628.js",
+            "https://a-v2.sndcdn.com/assets/1-f2928cd3.js",
+            "https://a-v2.sndcdn.com/assets/3-a24bc1da.js",
+            "https://a-v2.sndcdn.com/assets/2-6f1f9d2b.js",
+            "https://a-v2.sndcdn.com/assets/0-ac6cb997.js",
+            "https://a-v2.sndcdn.com/assets/48-80640ddc.js",
+        ]
+
+    def test_bundle_name(self):
+        assert get_bundle_name("https://a-v2.sndcdn.com/assets/49-7141e628.js") == (
+            "https://a-v2.sndcdn.com/assets/49"
+        )
+
+    def mock_stream(self, url):
+        self.api._get = mock.Mock(
+            return_value={
+                "kind": "track",
+                "id": 1,
+                "title": "Track",
+                "streamable": True,
+                "sharing": "public",
+                "permalink_url": "https://soundcloud.com/track",
+                "stream_url": "https://api.soundcloud.com/tracks/1/stream",
+            }
+        )
+        self.api.get_streamable_url = mock.Mock(return_value=url)
+
+    def test_stream_url_is_cached(self):
+        url = f"https://cf-media.sndcdn.com/a.mp3?Expires={int(time.time()) + 3600}"
+        self.mock_stream(url)
+        self.api.prefetch_stream_urls([1])
+        assert self.api.get_stream_url(1) == url
+        assert self.api.get_stream_url("1") == url
+        self.api.get_streamable_url.assert_called_once()
+
+    def test_prefetch_is_bounded(self):
+        active = []
+        peak = []
+        lock = threading.Lock()
+
+        def resolve(track_id):
+            with lock:
+                active.append(track_id)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(track_id)
+            return track_id
+
+        self.api._resolve_stream_url = resolve
+        self.api.prefetch_stream_urls(range(8))
+        assert self.api.get_stream_url(7) == "7"
+        assert max(peak) <= STREAM_PREFETCH_WORKERS
+
+    def test_queued_stream_url_is_refreshed_before_expiry(self):
+        # Refreshed within a second, as it expires just after the margins
+        expiry = time.time() + STREAM_URL_EXPIRY_MARGIN + STREAM_URL_REFRESH_AHEAD
+        url = f"https://cf-media.sndcdn.com/a.mp3?Expires={int(expiry) + 1}"
+        self.mock_stream(url)
+        resolved = threading.Semaphore(0)
+
+        def get_streamable_url(*_args):
+            resolved.release()
+            return url
+
+        self.api.get_streamable_url.side_effect = get_streamable_url
+        self.api.prefetch_stream_urls([1])
+        assert resolved.acquire(timeout=1)
+        assert resolved.acquire(timeout=3)
+
+    def test_dequeued_stream_url_is_not_refreshed(self):
+        expiry = time.time() + STREAM_URL_EXPIRY_MARGIN + STREAM_URL_REFRESH_AHEAD
+        url = f"https://cf-media.sndcdn.com/a.mp3?Expires={int(expiry) + 1}"
+        self.mock_stream(url)
+        self.api.prefetch_stream_urls([1])
+        assert self.api.get_stream_url(1) == url
+        self.api.prefetch_stream_urls([])
+
+        time.sleep(1.5)
+        self.api.get_streamable_url.assert_called_once()
+
+    def test_expired_stream_url_is_not_cached(self):
+        url = f"https://cf-media.sndcdn.com/a.mp3?Expires={int(time.time()) + 10}"
+        self.mock_stream(url)
+        assert self.api.get_stream_url(1) == url
+        assert self.api.get_stream_url(1) == url
+        assert self.api.get_streamable_url.call_count == 2
+
     @my_vcr.use_cassette("sc-resolve-track-id.yaml")
     def test_unstreamable_track(self):
         track = self.api._get("tracks/13158665")
@@ -199,14 +713,158 @@ class ApiTest(unittest.TestCase):
         track = self.api.parse_track(track)
         assert track is None
 
+    def test_parse_track_reuses_models(self):
+        playlist = [
+            {
+                "kind": "track",
+                "id": i,
+                "title": f"Track {i}",
+                "streamable": True,
+                "duration": 1000,
+                "user": {"username": "yndi halda"},
+            }
+            for i in range(5000)
+        ]
+        first = self.api.parse_results(playlist)
+        second = self.api.parse_results([dict(track) for track in playlist])
+        assert len(first) == 5000
+        assert all(a is b for a, b in zip(first, second, strict=True))
+        assert self.api.cache_stats()["parse_track"]["hits"] == 5000
+
+    def test_parse_track_detects_changed_payload(self):
+        data = {"kind": "track", "id": 1, "title": "Old", "streamable": True}
+        assert self.api.parse_track(data).name == "Old"
+        assert self.api.parse_track({**data, "title": "New"}).name == "New"
+
+    def test_resolve_tracks_in_batches(self):
+        def get(url, params=()):
+            ids = dict(params)["ids"].split(",")
+            return [
+                {"kind": "track", "id": int(i), "title": i, "streamable": True}
+                for i in reversed(ids)
+            ]
+
+        self.api._get = mock.Mock(side_effect=get)
+        track_ids = [str(i) for i in range(120)]
+        tracks = self.api.resolve_tracks([*track_ids, "3"])
+        assert [track.name for track in tracks] == [*track_ids, "3"]
+        assert self.api._get.call_count == 3
+
+    def test_resolve_tracks_requests_batches_concurrently(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def get(url, params=()):
+            with lock:
+                active.append(url)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(url)
+            return []
+
+        self.api._get = mock.Mock(side_effect=get)
+        self.api.resolve_tracks(range(200))
+        assert self.api._get.call_count == 4
+        assert max(peak) > 1
+
+    def test_resolve_tracks_uses_cached_tracks(self):
+        track = TrackRecord("soundcloud:song/Cached.1", name="Cached")
+        SoundCloudClient._get_track.set_cached(self.api, "1", value=track)
+        self.api._get = mock.Mock(return_value=[])
+        assert self.api.resolve_tracks([1, 2]) == [track]
+        self.api._get.assert_called_once_with("tracks", params=[("ids", "2")])
+
+    def test_resolve_tracks_caches_resolved_tracks(self):
+        self.api._get = mock.Mock(
+            return_value=[
+                {"kind": "track", "id": i, "title": str(i), "streamable": True}
+                for i in (1, 2)
+            ]
+        )
+        first = self.api.resolve_tracks(["1", "2"])
+        second = self.api.resolve_tracks(["1", "2"])
+        assert [track.name for track in second] == ["1", "2"]
+        assert second == first
+        self.api._get.assert_called_once()
+        assert SoundCloudClient._get_track.cache_info()["size"] == 0
+
     def test_parse_fail_reason(self):
         test_reason = "Unknown"
         reason_res = self.api.parse_fail_reason(test_reason)
         assert reason_res == ""
 
+    def test_search_query_runs_one_request_per_date(self):
+        def get(url, limit=None, params=()):
+            year = "2013" if "2013" in url else "2009"
+            return [
+                {"kind": "track", "id": 1, "title": "Ataraxia", "streamable": True},
+                {"kind": "track", "id": year, "title": "Live", "streamable": True},
+            ]
+
+        self.api._get = mock.Mock(side_effect=get)
+        tracks = self.api.search({"any": ["live"], "date": ["2009", "2013"]})
+
+        assert self.api._get.call_count == 2
+        url = self.api._get.call_args_list[0].args[0]
+        assert url.startswith("tracks?q=live&created_at%5Bfrom%5D=2009-01-01")
+        assert [track.uri for track in tracks] == [
+            "soundcloud:song/Live.2009",
+            "soundcloud:song/Live.2013",
+            "soundcloud:song/Ataraxia.1",
+        ]
+
+    def test_search_query_pages_up_to_budget(self):
+        def page(start, next_href):
+            return {
+                "collection": [
+                    {"kind": "track", "id": i, "title": f"T{i}", "streamable": True}
+                    for i in range(start, start + 3)
+                ],
+                "next_href": next_href,
+            }
+
+        pages = {"tracks?q=t": page(0, "page-2"), "page-2": page(3, "page-3")}
+        self.api._get = mock.Mock(side_effect=lambda url, **kwargs: pages[url])
+        self.api.max_search_results = 5
+
+        first = self.api.search({"any": ["t"]})
+        results = self.api.get_search_results(normalize_query({"any": ["t"]}))
+        tracks = results.wait(timeout=5, complete=True)
+
+        assert len(first) >= 3
+        assert [track.name for track in tracks] == ["T0", "T1", "T2", "T3", "T4"]
+        assert [c.args[0] for c in self.api._get.call_args_list] == [
+            "tracks?q=t",
+            "page-2",
+        ]
+
+    def test_identical_searches_share_results(self):
+        self.api._get = mock.Mock(return_value=[])
+        self.api.search({"any": ["Pelican"]})
+        self.api.search({"any": ["  pelican "]})
+        self.api._get.assert_called_once()
+
+    def test_failed_searches_are_not_shared(self):
+        self.api._get = mock.Mock(return_value={})
+        assert self.api.search({"any": ["Pelican"]}) == []
+        self.api.search({"any": ["Pelican"]})
+        assert self.api._get.call_count == 2
+
+    def test_exact_search_query_drops_partial_matches(self):
+        self.api._get = mock.Mock(
+            return_value=[
+                {"kind": "track", "id": 1, "title": "Live", "streamable": True},
+                {"kind": "track", "id": 2, "title": "Live 2", "streamable": True},
+            ]
+        )
+        tracks = self.api.search({"track_name": ["live"]}, exact=True)
+        assert [track.name for track in tracks] == ["Live"]
+
     @my_vcr.use_cassette("sc-search.yaml")
     def test_search(self):
         tracks = self.api.search("the great descent")
         assert len(tracks) == 10
-        assert isinstance(tracks[0], Track)
+        assert isinstance(tracks[0], TrackRecord)
         assert tracks[0].name == "Turn Around (Mix1)"
@@ -1,17 +1,30 @@
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 
+from mopidy_soundcloud.cache import LRUCache
 from mopidy_soundcloud.soundcloud import cache
 
 
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
 class CacheTest(unittest.TestCase):
     def test_decorator(self):
-        func = mock.Mock()
-        decorated_func = cache()
-        decorated_func(func)
-        func()
-        assert func.called is True
-        assert decorated_func._call_count == 1
+        func = mock.Mock(return_value="ok")
+        decorated_func = cache()(func)
+        assert decorated_func("a") == "ok"
+        assert decorated_func("a") == "ok"
+        func.assert_called_once_with("a")
+        assert decorated_func.cache_info()["hits"] == 1
+        assert decorated_func.cache_info()["misses"] == 1
 
     def test_set_default_cache(self):
         @cache()
@@ -21,9 +34,218 @@ class CacheTest(unittest.TestCase):
         assert returnstring() == "ok"
 
     def test_set_ttl_cache(self):
-        func = mock.Mock()
-        decorated_func = cache(func, ttl=5)
-        func()
-        assert func.called is True
-        assert decorated_func._call_count == 1
-        assert decorated_func.ttl == 5
+        decorator = cache(ttl=5)
+        decorator(mock.Mock())
+        assert decorator.ttl == 5
+
+    def test_unhashable_arguments_are_not_cached(self):
+        func = mock.Mock(return_value="ok")
+        decorated_func = cache()(func)
+        assert decorated_func({"id": 1}) == "ok"
+        assert decorated_func({"id": 1}) == "ok"
+        assert func.call_count == 2
+
+    def test_call_count_is_per_key(self):
+        func = mock.Mock(side_effect=lambda key: key)
+        decorated_func = cache(ctl=2)(func)
+        decorated_func("hot")
+        decorated_func("cold")
+        for _ in range(5):
+            decorated_func("hot")
+        func.reset_mock()
+        decorated_func("cold")
+        func.assert_not_called()
+
+    def test_scoped_per_instance(self):
+        class Client:
+            calls = 0
+
+            @cache()
+            def get(self, key):
+                self.calls += 1
+                return key
+
+        first, second = Client(), Client()
+        first.get(1)
+        first.get(1)
+        second.get(1)
+        assert first.calls == 1
+        assert second.calls == 1
+        assert Client.get.cache_info(first)["hits"] == 1
+        assert Client.get.cache_info(second)["hits"] == 0
+
+    def test_concurrent_calls_share_one_call(self):
+        release = threading.Event()
+        func = mock.Mock(side_effect=lambda key: release.wait(5) and key)
+        decorated_func = cache()(func)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(decorated_func("a")))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)  # Let all callers queue up behind the first
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        func.assert_called_once_with("a")
+        assert results == ["a"] * 10
+
+    def test_concurrent_callers_share_errors(self):
+        release = threading.Event()
+
+        def fail(key):
+            release.wait(5)
+            raise ValueError(key)
+
+        func = mock.Mock(side_effect=fail)
+        decorated_func = cache()(func)
+        errors = []
+
+        def call():
+            try:
+                decorated_func("a")
+            except ValueError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        func.assert_called_once_with("a")
+        assert len(errors) == 3
+        # Failures aren't cached
+        func.side_effect = None
+        func.return_value = "ok"
+        assert decorated_func("a") == "ok"
+
+    def test_serves_stale_result_while_refreshing(self):
+        calls = []
+        refreshed = threading.Event()
+
+        class Client:
+            @cache(ttl=0.05)
+            def get(self):
+                calls.append(threading.current_thread().name)
+                if len(calls) > 1:
+                    refreshed.set()
+                return len(calls)
+
+        client = Client()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Refresh")
+        self.addCleanup(executor.shutdown)
+        Client.get.serve_stale(client, 60, executor)
+        assert client.get() == 1
+        time.sleep(0.06)
+        assert client.get() == 1
+        assert refreshed.wait(5)
+        time.sleep(0.01)
+        assert client.get() == 2
+        assert calls == ["MainThread", "Refresh_0"]
+
+    def test_waits_for_result_older_than_max_staleness(self):
+        class Client:
+            calls = 0
+
+            @cache(ttl=0.05, stale=60)
+            def get(self):
+                self.calls += 1
+                return self.calls
+
+        client = Client()
+        Client.get.serve_stale(client, 0, ThreadPoolExecutor(max_workers=1))
+        assert client.get() == 1
+        time.sleep(0.06)
+        assert client.get() == 2
+
+    def test_refreshes_right_away_once_executor_is_shut_down(self):
+        func = mock.Mock(side_effect=[1, 2])
+
+        class Client:
+            @cache(ttl=0.05)
+            def get(self):
+                return func()
+
+        client = Client()
+        executor = ThreadPoolExecutor(max_workers=1)
+        Client.get.serve_stale(client, 60, executor)
+        assert client.get() == 1
+        executor.shutdown()
+        time.sleep(0.06)
+        assert client.get() == 2
+
+    def test_keeps_stale_result_when_refresh_fails(self):
+        func = mock.Mock(return_value="ok")
+        decorated_func = cache(ttl=0.05, stale=60)(func)
+        assert decorated_func("a") == "ok"
+        time.sleep(0.06)
+        func.side_effect = ValueError("offline")
+        assert decorated_func("a") == "ok"
+        time.sleep(0.05)
+        assert decorated_func("a") == "ok"
+
+
+class LRUCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = LRUCache(maxsize=2, ttl=10, clock=self.clock)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+        assert "a" in self.cache
+        assert "b" not in self.cache
+        assert self.cache.stats()["evictions"] == 1
+
+    def test_expires_after_ttl(self):
+        self.cache.set("a", 1)
+        self.clock.now = 9
+        assert self.cache.get("a") == 1
+        self.clock.now = 10
+        assert self.cache.get("a") is None
+        assert len(self.cache) == 0
+
+    def test_keeps_stale_entries(self):
+        self.cache.stale = 5
+        self.cache.set("a", 1)
+        self.clock.now = 12
+        assert self.cache.get("a") is None
+        assert self.cache.get_stale("a") == 1
+        self.clock.now = 15
+        assert self.cache.get_stale("a") is None
+        assert len(self.cache) == 0
+
+    def test_per_key_ttl(self):
+        self.cache.set("a", 1, ttl=1)
+        self.clock.now = 2
+        assert self.cache.get("a") is None
+
+    def test_evicts_beyond_maxbytes(self):
+        cache = LRUCache(maxsize=10, maxbytes=5, sizeof=len, clock=self.clock)
+        cache.set("a", "xx")
+        cache.set("b", "xx")
+        cache.set("c", "xx")
+        assert "a" not in cache
+        assert "b" in cache
+        cache.set("d", "x" * 6)
+        assert "d" not in cache
+        assert "c" in cache
+
+    def test_counts_bytes(self):
+        cache = LRUCache(sizeof=len, clock=self.clock)
+        cache.set("a", "x" * 1000)
+        assert cache.stats()["bytes"] == 1000
+        cache.clear()
+        assert cache.stats()["bytes"] == 0
+
+    def test_bytes_are_only_counted_with_sizeof(self):
+        self.cache.set("a", "x" * 1000)
+        assert "bytes" not in self.cache.stats()
@@ -0,0 +1,59 @@
+import unittest
+
+from mopidy_soundcloud.catalog import SetCatalog
+from mopidy_soundcloud.records import TrackRecord
+
+
+def record(track_id):
+    return TrackRecord(f"soundcloud:song/T.{track_id}", name="T")
+
+
+class SetCatalogTest(unittest.TestCase):
+    def setUp(self):
+        self.catalog = SetCatalog()
+
+    def test_truncated_listing_is_incomplete(self):
+        assert self.catalog.add("1", "Set", ["1", "2"], track_count=3).complete is False
+        assert self.catalog.add("2", "Set", ["1", "2"]).complete is True
+        assert len(self.catalog) == 2
+        assert "1" in self.catalog
+
+    def test_missing_ids_by_page(self):
+        entry = self.catalog.add("1", "Set", [record(1), "2", record(3), "4"])
+        assert entry.missing() == ["2", "4"]
+        assert entry.missing(2, 4) == ["4"]
+
+    def test_fill_keeps_positions(self):
+        entry = self.catalog.add("1", "Set", [record(1), "2", "3"])
+        self.catalog.fill("1", ["2", "3"], {"2": record(2)})
+        assert entry.items == [record(1), record(2), None]
+        assert entry.missing() == []
+        assert entry.complete is True
+
+    def test_fill_keeps_ids_that_were_not_requested(self):
+        entry = self.catalog.add("1", "Set", ["1", "2", "3", "4"])
+        self.catalog.fill("1", ["1", "2"], {"1": record(1)})
+        assert entry.items == [record(1), None, "3", "4"]
+        assert entry.missing() == ["3", "4"]
+
+    def test_relisting_keeps_resolved_tracks(self):
+        self.catalog.add(
+            "1", "Set", ["1", "2", "3"], track_count=4, ids=["1", "2", "3"]
+        )
+        self.catalog.fill("1", ["1", "2"], {"1": record(1)})
+        entry = self.catalog.add(
+            "1", "Set", ["1", "2", "3"], track_count=4, ids=["1", "2", "3"]
+        )
+        assert entry.items == [record(1), None, "3"]
+
+    def test_relisting_keeps_completed_set(self):
+        ids = ["1", "2", "3"]
+        self.catalog.add("1", "Set", [record(i) for i in ids], ids=ids)
+        entry = self.catalog.add("1", "Set", ["1", "2"], track_count=3, ids=ids[:2])
+        assert entry.complete is True
+        assert entry.items == [record(1), record(2), record(3)]
+
+    def test_changed_set_keeps_resolved_tracks_by_id(self):
+        self.catalog.add("1", "Set", [record(1), "2"], ids=["1", "2"])
+        entry = self.catalog.add("1", "Set", ["3", "1"], ids=["3", "1"])
+        assert entry.items == ["3", record(1)]
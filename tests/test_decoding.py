@@ -0,0 +1,194 @@
+import json
+import unittest
+from unittest import mock
+
+from mopidy_soundcloud import decoding
+from mopidy_soundcloud.decoding import (
+    PAGE,
+    ActivityPage,
+    Resource,
+    decode,
+    get_schema,
+)
+from mopidy_soundcloud.soundcloud import SoundCloudClient
+from tests import get_config
+
+
+def user_payload(i):
+    return {
+        "avatar_url": f"https://i1.sndcdn.com/avatars-{i:012d}-abcdef-large.jpg",
+        "id": 1000 + i,
+        "kind": "user",
+        "permalink_url": f"https://soundcloud.com/artist-{i}",
+        "uri": f"https://api.soundcloud.com/users/{1000 + i}",
+        "username": f"Artist {i}",
+        "permalink": f"artist-{i}",
+        "last_modified": "2024/01/01 12:00:00 +0000",
+        "followers_count": 1234 + i,
+        "country": None,
+        "city": "Berlin",
+    }
+
+
+def track_payload(i):
+    """A track as the API returns it, with everything the extension ignores"""
+    return {
+        "kind": "track",
+        "id": 100000000 + i,
+        "created_at": "2024/01/01 12:00:00 +0000",
+        "last_modified": f"2024/01/{i % 28 + 1:02d} 12:00:00 +0000",
+        "user_id": 1000 + i % 50,
+        "duration": 180000 + i,
+        "commentable": True,
+        "comment_count": i % 100,
+        "sharing": "public",
+        "tag_list": 'electronic ambient "field recording" berlin',
+        "streamable": True,
+        "embeddable_by": "all",
+        "purchase_url": None,
+        "purchase_title": None,
+        "genre": "Electronic",
+        "title": f"Track {i}",
+        "description": "Recorded live. " * 20,
+        "label_name": None,
+        "release": None,
+        "key_signature": None,
+        "isrc": None,
+        "bpm": None,
+        "release_year": 2024,
+        "release_month": 1,
+        "release_day": 1,
+        "license": "all-rights-reserved",
+        "uri": f"https://api.soundcloud.com/tracks/{100000000 + i}",
+        "user": user_payload(i % 50),
+        "permalink_url": f"https://soundcloud.com/artist-{i % 50}/track-{i}",
+        "artwork_url": f"https://i1.sndcdn.com/artworks-{i:012d}-large.jpg",
+        "stream_url": f"https://api.soundcloud.com/tracks/{100000000 + i}/stream",
+        "download_url": None,
+        "waveform_url": f"https://wave.sndcdn.com/{i:012d}_m.png",
+        "available_country_codes": None,
+        "secret_uri": None,
+        "user_favorite": False,
+        "user_playback_count": None,
+        "playback_count": 10000 + i,
+        "download_count": 0,
+        "favoritings_count": 100 + i,
+        "reposts_count": 10,
+        "downloadable": False,
+        "access": "playable",
+        "policy": "ALLOW",
+        "monetization_model": "NOT_APPLICABLE",
+    }
+
+
+def playlist_payload(i, tracks):
+    return {
+        "kind": "playlist",
+        "id": 5000 + i,
+        "title": f"Set {i}",
+        "description": "A set. " * 20,
+        "duration": sum(track["duration"] for track in tracks),
+        "user": user_payload(i % 50),
+        "permalink_url": f"https://soundcloud.com/artist-{i % 50}/sets/set-{i}",
+        "artwork_url": None,
+        "track_count": len(tracks),
+        "tracks": tracks,
+    }
+
+
+# Benchmark fixtures, sized like the largest responses seen in practice
+def large_set():
+    """``playlists/<id>`` of a set of 500 tracks, about 1 MB"""
+    return json.dumps(playlist_payload(0, [track_payload(i) for i in range(500)]))
+
+
+def large_stream():
+    """A page of ``me/activities`` with 25 reposted sets of 100 tracks each,
+    about 5 MB"""
+    collection = [
+        {
+            "type": "playlist-repost",
+            "created_at": "2024/01/01 12:00:00 +0000",
+            "origin": playlist_payload(
+                i, [track_payload(i * 100 + j) for j in range(100)]
+            ),
+        }
+        for i in range(25)
+    ]
+    return json.dumps(
+        {
+            "collection": collection,
+            "next_href": "https://api.soundcloud.com/me/activities?cursor=1",
+            "future_href": "https://api.soundcloud.com/me/activities?uuid=2",
+        }
+    )
+
+
+class SchemaTest(unittest.TestCase):
+    def test_schema_by_url(self):
+        api = "https://api.soundcloud.com/"
+        assert get_schema(f"{api}tracks/13158665") is Resource
+        assert get_schema(f"{api}playlists/10961826") is Resource
+        assert get_schema(f"{api}resolve?url=https://soundcloud.com/a") is Resource
+        assert get_schema(f"{api}me/favorites?limit=10") == PAGE
+        assert get_schema(f"{api}users/1/tracks") == PAGE
+        assert get_schema(f"{api}tracks?ids=1,2") == PAGE
+        assert get_schema(f"{api}me/activities?uuid=1") is ActivityPage
+        assert get_schema(f"{api}me") is None
+
+    def test_standard_library_fallback(self):
+        content = large_set().encode()
+        with mock.patch.object(decoding, "msgspec", None):
+            assert decode(content, Resource) == json.loads(content)
+
+
+@unittest.skipIf(decoding.msgspec is None, "msgspec is not installed")
+class SchemaDecodingTest(unittest.TestCase):
+    def setUp(self):
+        self.api = SoundCloudClient(get_config())
+
+    def tearDown(self):
+        self.api.close()
+
+    def build_tracks(self, document):
+        """Builds the tracks of a set or of a page of activities"""
+        if "collection" in document:
+            tracks = [
+                track
+                for activity in document["collection"]
+                for track in activity["origin"]["tracks"]
+            ]
+        else:
+            tracks = document["tracks"]
+        return [self.api._build_track(track, False) for track in tracks]  # noqa: FBT003
+
+    def test_decodes_only_used_fields(self):
+        playlist = decode(large_set().encode(), Resource)
+        assert "description" not in playlist
+        assert "waveform_url" not in playlist["tracks"][0]
+        assert playlist["tracks"][0]["user"] == {"id": 1000, "username": "Artist 0"}
+
+    def test_parses_like_full_documents(self):
+        content = large_stream().encode()
+        page = decode(content, ActivityPage)
+        full = json.loads(content)
+        assert self.build_tracks(page) == self.build_tracks(full)
+        assert page["future_href"] == full["future_href"]
+
+    def test_falls_back_to_full_decoding(self):
+        content = b'{"kind": "track", "id": "not a number"}'
+        assert decode(content, Resource) == json.loads(content)
+
+    def test_decodes_benchmark_fixtures(self):
+        """Decodes the fixtures timed by ``python -m tests.benchmark`` like the
+        standard library does"""
+        for content, schema in (
+            (large_set().encode(), Resource),
+            (large_stream().encode(), ActivityPage),
+        ):
+            fast = decode(content, schema)
+            full = json.loads(content)
+
+            assert self.build_tracks(fast) == self.build_tracks(full)
+            assert "description" not in str(fast)
+            assert "waveform_url" not in str(fast)
@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+import unittest
+
+import pytest
+
+from mopidy_soundcloud.eventloop import EventLoopThread
+
+
+class EventLoopThreadTest(unittest.TestCase):
+    def setUp(self):
+        self.loop = EventLoopThread(max_workers=2)
+
+    def tearDown(self):
+        self.loop.close()
+
+    def test_run_returns_result(self):
+        async def add(a, b):
+            return a + b
+
+        assert self.loop.run(add(1, 2)) == 3
+
+    def test_submit_returns_future(self):
+        async def name():
+            return threading.current_thread().name
+
+        assert self.loop.submit(name()).result(5) == "SoundCloudLoop"
+
+    def test_blocking_calls_are_bounded_by_workers(self):
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def work(i):
+            with lock:
+                active.append(i)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.remove(i)
+            return i
+
+        async def fan_out():
+            return await asyncio.gather(
+                *(self.loop.run_blocking(work, i) for i in range(6))
+            )
+
+        assert self.loop.run(fan_out()) == list(range(6))
+        assert max(peak) == 2
+
+    def test_call_later_runs_on_loop_thread(self):
+        called = threading.Event()
+        threads = []
+
+        def callback(value):
+            threads.append((threading.current_thread().name, value))
+            called.set()
+
+        self.loop.call_later(0.01, callback, 1)
+        assert called.wait(1)
+        assert threads == [("SoundCloudLoop", 1)]
+
+    def test_run_inside_loop_fails(self):
+        async def nested():
+            async def inner():
+                return 1
+
+            self.loop.run(inner())
+
+        with pytest.raises(RuntimeError):
+            self.loop.run(nested())
+
+    def test_close_is_idempotent(self):
+        self.loop.close()
+        self.loop.close()
+        assert self.loop.loop.is_closed()
@@ -17,3 +17,13 @@ def test_get_config_schema():
 
     assert "auth_token" in schema
     assert "explore_songs" in schema
+    assert "max_items" in schema
+    assert "max_staleness" in schema
+    assert "max_search_results" in schema
+    assert "rate_limit" in schema
+    assert "rate_limit_burst" in schema
+    assert "rate_limit_wait" in schema
+    assert "max_retries" in schema
+    assert "retry_max_time" in schema
+    assert "persistent_cache" in schema
+    assert "prefetch_tracks" in schema
@@ -0,0 +1,107 @@
+import io
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import requests
+
+from mopidy_soundcloud.httpcache import CachingHttpAdapter, HttpCache
+from mopidy_soundcloud.ratelimit import RateLimiter
+from mopidy_soundcloud.store import MetadataStore
+
+URL = "https://api.soundcloud.com/me/playlists?limit=10"
+
+
+def make_response(status=200, body=b"", headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    response.raw = io.BytesIO(body)
+    response.url = URL
+    return response
+
+
+class CachingHttpAdapterTest(unittest.TestCase):
+    def setUp(self):
+        self.adapter = CachingHttpAdapter(RateLimiter(rate=100, burst=100))
+
+    def get(self, response):
+        request = requests.Request("GET", URL).prepare()
+        with mock.patch(
+            "requests.adapters.HTTPAdapter.send", return_value=response
+        ) as send:
+            return self.adapter.send(request), send.call_args.args[0]
+
+    def test_revalidates_with_etag(self):
+        self.get(make_response(body=b'{"a": 1}', headers={"ETag": '"v1"'}))
+
+        response, sent = self.get(make_response(304, headers={"ETag": '"v1"'}))
+
+        assert sent.headers["If-None-Match"] == '"v1"'
+        assert response.status_code == 200
+        assert response.json() == {"a": 1}
+        assert response.from_cache
+        assert self.adapter.not_modified == 1
+
+    def test_revalidates_with_last_modified(self):
+        date = "Wed, 21 Oct 2015 07:28:00 GMT"
+        self.get(make_response(body=b"[]", headers={"Last-Modified": date}))
+
+        _response, sent = self.get(make_response(304))
+
+        assert sent.headers["If-Modified-Since"] == date
+
+    def test_replaces_changed_response(self):
+        self.get(make_response(body=b"1", headers={"ETag": '"v1"'}))
+        self.get(make_response(body=b"2", headers={"ETag": '"v2"'}))
+
+        response, sent = self.get(make_response(304))
+
+        assert sent.headers["If-None-Match"] == '"v2"'
+        assert response.json() == 2
+
+    def test_skips_responses_without_validators(self):
+        self.get(make_response(body=b"[]"))
+
+        _response, sent = self.get(make_response(body=b"[]"))
+
+        assert "If-None-Match" not in sent.headers
+        assert len(self.adapter.cache.memory) == 0
+
+    def test_skips_no_store_responses(self):
+        headers = {"ETag": '"v1"', "Cache-Control": "no-store"}
+        self.get(make_response(body=b"[]", headers=headers))
+
+        assert len(self.adapter.cache.memory) == 0
+
+
+class HttpCacheTest(unittest.TestCase):
+    def test_memory_is_bounded_by_body_size(self):
+        cache = HttpCache(maxbytes=10)
+        cache.set(URL, make_response(body=b"x" * 8, headers={"ETag": '"v1"'}))
+        cache.set("other", make_response(body=b"x" * 8, headers={"ETag": '"v1"'}))
+        assert cache.get(URL) is None
+        assert cache.get("other") is not None
+
+    def test_prunes_disk_cache(self):
+        store = mock.Mock()
+        cache = HttpCache(store=store, max_disk_bytes=100)
+        for i in range(65):
+            cache.set(f"{URL}&offset={i}", make_response(headers={"ETag": '"v1"'}))
+        assert store.prune.call_args_list == [mock.call(100)] * 2
+
+    def test_survives_restart_on_disk(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "http.sqlite3"
+            body = "Motörhead".encode()
+            cache = HttpCache(store=MetadataStore(path))
+            cache.set(URL, make_response(body=body, headers={"ETag": '"v1"'}))
+            cache.store.close()
+
+            cache = HttpCache(store=MetadataStore(path))
+            entry = cache.get(URL)
+            cache.store.close()
+
+        assert entry["headers"] == {"ETag": '"v1"'}
+        assert entry["body"].encode("latin-1") == body
@@ -1,25 +1,38 @@
+import json
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import ClassVar
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
 import pykka
-from mopidy.models import Ref
+from mopidy.models import Ref, TlTrack, Track
 
-from mopidy_soundcloud import Extension, actor
+from mopidy_soundcloud import actor
 from mopidy_soundcloud.library import (
     SoundCloudLibraryProvider,
     new_folder,
     simplify_search_query,
+    to_tracks,
 )
-from mopidy_soundcloud.soundcloud import safe_url
+from mopidy_soundcloud.ratelimit import RateLimiter
+from mopidy_soundcloud.records import TrackRecord
+from mopidy_soundcloud.soundcloud import API_POOL_SIZE, SoundCloudClient, safe_url
+from mopidy_soundcloud.store import MetadataStore
+from tests import get_config
 
 
 class ApiTest(unittest.TestCase):
     def setUp(self):
-        config = Extension().get_config_schema()
-        config["auth_token"] = "1-35204-61921957-55796ebef403996"  # noqa: S105
         # using this user http://maildrop.cc/inbox/mopidytestuser
-        self.backend = actor.SoundCloudBackend.start(
-            config={"soundcloud": config, "proxy": {}}, audio=None
-        ).proxy()
+        config = get_config(
+            auth_token="1-35204-61921957-55796ebef403996",  # noqa: S106
+            max_retries=0,
+        )
+        self.backend = actor.SoundCloudBackend.start(config=config, audio=None).proxy()
         self.library = SoundCloudLibraryProvider(backend=self.backend)
 
     def tearDown(self):
@@ -87,3 +100,327 @@ class ApiTest(unittest.TestCase):
                 uri="soundcloud:directory:stream",
             ),
         ]
+
+    def test_prefetches_upcoming_stream_urls(self):
+        tl_tracks = [
+            TlTrack(tlid=i, track=Track(uri=uri))
+            for i, uri in enumerate(
+                [
+                    "soundcloud:song/Playing.1",
+                    "soundcloud:song/Next.2",
+                    "file:///music/local.mp3",
+                    "soundcloud:song/Later.3",
+                    "soundcloud:song/Much later.4",
+                ],
+                start=1,
+            )
+        ]
+        core = mock.Mock()
+        tracklist = core.proxy.return_value.tracklist
+        tracklist.index.return_value.get.return_value = 0
+        tracklist.slice.side_effect = lambda start, end: mock.Mock(
+            get=mock.Mock(return_value=tl_tracks[start:end])
+        )
+        backend = mock.Mock(prefetch_tracks=3)
+        backend.remote.parse_track_uri.side_effect = lambda uri: uri.split(".")[-1]
+
+        with mock.patch.object(
+            pykka.ActorRegistry, "get_by_class", return_value=[core]
+        ):
+            actor.SoundCloudBackend._prefetch_after(backend, tl_tracks[0])
+
+        assert list(backend.remote.prefetch_stream_urls.call_args.args[0]) == [
+            "2",
+            "3",
+        ]
+
+    def test_prefetches_when_tracklist_changes(self):
+        tl_tracks = [
+            TlTrack(tlid=i, track=Track(uri=f"soundcloud:song/Queued.{i}"))
+            for i in range(1, 6)
+        ]
+        core = mock.Mock()
+        proxy = core.proxy.return_value
+        proxy.playback.get_current_tl_track.return_value.get.return_value = None
+        proxy.tracklist.slice.side_effect = lambda start, end: mock.Mock(
+            get=mock.Mock(return_value=tl_tracks[start:end])
+        )
+        backend = mock.Mock(prefetch_tracks=3)
+        backend.remote.parse_track_uri.side_effect = lambda uri: uri.split(".")[-1]
+
+        with mock.patch.object(
+            pykka.ActorRegistry, "get_by_class", return_value=[core]
+        ):
+            actor.SoundCloudBackend._prefetch_after(backend)
+
+        proxy.tracklist.slice.assert_called_once_with(0, 3)
+        assert list(backend.remote.prefetch_stream_urls.call_args.args[0]) == [
+            "1",
+            "2",
+            "3",
+        ]
+
+    def test_translate_uri_uses_stream_url_cache(self):
+        backend = mock.Mock()
+        backend.remote.parse_track_uri.return_value = "1"
+        backend.remote.get_stream_url.return_value = "https://cf-media/1.mp3"
+        playback = actor.SoundCloudPlaybackProvider(audio=None, backend=backend)
+        assert playback.translate_uri("soundcloud:song/Track.1") == (
+            "https://cf-media/1.mp3"
+        )
+        backend.remote.get_stream_url.assert_called_once_with("1")
+
+    def test_lookup_many_resolves_in_batch(self):
+        backend = mock.Mock()
+        backend.remote.parse_track_uri.side_effect = lambda track: getattr(
+            track, "uri", track
+        ).split(".")[-1]
+        track = TrackRecord("soundcloud:song/Track.1", name="Track")
+        backend.remote.resolve_tracks.return_value = [track]
+        library = SoundCloudLibraryProvider(backend=backend)
+
+        result = library.lookup_many(
+            ["soundcloud:song/Track.1", "soundcloud:song/Missing.2"]
+        )
+
+        assert result == {
+            "soundcloud:song/Track.1": [track.to_track()],
+            "soundcloud:song/Missing.2": [],
+        }
+        backend.remote.resolve_tracks.assert_called_once()
+
+    def test_lookup_many_looks_up_other_uris_one_by_one(self):
+        backend = mock.Mock()
+        backend.remote.parse_track_uri.side_effect = lambda uri: uri.split(".")[-1]
+        backend.remote.resolve_tracks.return_value = []
+        backend.remote.get_track.return_value = None
+        library = SoundCloudLibraryProvider(backend=backend)
+
+        library.lookup_many(["soundcloud:song/Track.1", "soundcloud:song/Secret.s2"])
+
+        backend.remote.resolve_tracks.assert_called_once_with({"1": None})
+        backend.remote.get_track.assert_called_once_with("s2")
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests: ClassVar[list[str]] = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        self.requests.append(url.path)
+        ids = parse_qs(url.query)["ids"][0].split(",")
+        body = json.dumps(
+            [
+                {"kind": "track", "id": int(i), "title": f"Track {i}", "streamable": 1}
+                for i in ids
+            ]
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LookupManyTest(unittest.TestCase):
+    def setUp(self):
+        FakeApiHandler.requests = []
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeApiHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.remote = SoundCloudClient(get_config(auth_token="1-fake-token"))  # noqa: S106
+        self.remote.api_url = f"http://127.0.0.1:{self.server.server_port}/"
+        self.remote.http_adapter.limiter = RateLimiter(rate=1000, burst=1000)
+        self.remote.http_client.mount(self.remote.api_url, self.remote.http_adapter)
+        backend = mock.Mock(remote=self.remote)
+        self.library = SoundCloudLibraryProvider(backend=backend)
+
+    def tearDown(self):
+        self.remote.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_lookup_1000_uris(self):
+        uris = [f"soundcloud:song/Track {i}.{i}" for i in range(1000)]
+
+        result = self.library.lookup_many([*uris, *uris[:100]])
+
+        assert list(result) == uris
+        assert all(len(tracks) == 1 for tracks in result.values())
+        assert result[uris[42]][0].name == "Track 42"
+        assert FakeApiHandler.requests == ["/tracks"] * 20
+
+    def test_reuses_connections(self):
+        self.library.lookup_many([f"soundcloud:song/T.{i}" for i in range(500)])
+
+        stats = self.remote.http_stats()
+        assert stats["requests"] == 10
+        assert stats["connections"] <= API_POOL_SIZE
+        assert stats["reused"] == stats["requests"] - stats["connections"]
+        assert stats["retries"] == 0
+
+
+class SearchTest(unittest.TestCase):
+    def setUp(self):
+        self.remote = SoundCloudClient(get_config(auth_token="1-fake-token"))  # noqa: S106
+        self.remote.explore_songs = 2
+        self.remote.search = mock.Mock(return_value=[])
+        backend = mock.Mock(remote=self.remote)
+        self.library = SoundCloudLibraryProvider(backend=backend)
+        self.remote._get = mock.Mock(
+            return_value={
+                "collection": [
+                    {"kind": "track", "id": i, "title": title, "streamable": True}
+                    for i, title in enumerate(["Deny The Absolute", "Deny Everything"])
+                ]
+            }
+        )
+        self.liked, _more = self.remote.get_likes_page(1)
+
+    def tearDown(self):
+        self.remote.close()
+
+    def test_answers_from_seen_tracks(self):
+        result = self.library.search({"any": ["deny"]})
+
+        assert list(result.tracks) == to_tracks(self.liked[::-1])
+        self.remote.search.assert_not_called()
+
+    def test_merges_remote_results(self):
+        found = TrackRecord("soundcloud:song/Other.9", name="Deny The Absolute Live")
+        self.remote.search.return_value = [found, self.liked[0]]
+
+        result = self.library.search({"track_name": ["deny the absolute"]})
+
+        self.remote.search.assert_called_once_with(
+            {"track_name": ["deny the absolute"]}, exact=False
+        )
+        assert list(result.tracks) == to_tracks([self.liked[0], found])
+
+    def test_search_results_are_not_indexed(self):
+        self.remote.parse_track(
+            {"kind": "track", "id": 7, "title": "Deny Nothing", "streamable": True}
+        )
+
+        self.library.search({"track_name": ["nothing"]})
+
+        self.remote.search.assert_called_once_with(
+            {"track_name": ["nothing"]}, exact=False
+        )
+
+    def test_fields_not_in_index_are_searched_remotely(self):
+        query = {"any": ["deny"], "date": ["2014"]}
+        result = self.library.search(query)
+
+        assert list(result.tracks) == []
+        self.remote.search.assert_called_once_with(query, exact=False)
+
+    def test_exact_search(self):
+        result = self.library.search({"track_name": ["deny"]}, exact=True)
+
+        assert list(result.tracks) == []
+        self.remote.search.assert_called_once_with({"track_name": ["deny"]}, exact=True)
+
+
+class BrowseTest(unittest.TestCase):
+    def setUp(self):
+        self.remote = SoundCloudClient(get_config(auth_token="1-fake-token"))  # noqa: S106
+        self.remote.explore_songs = 2
+        self.remote.max_items = 10000
+        self.remote._get = mock.Mock(side_effect=self.get_page)
+        backend = mock.Mock(remote=self.remote)
+        self.library = SoundCloudLibraryProvider(backend=backend)
+
+    def tearDown(self):
+        self.remote.close()
+
+    def get_page(self, url, limit=None, params=()):
+        # Five likes, all called "Same", two per page
+        offset = int(parse_qs(urlparse(url).query).get("offset", ["0"])[0])
+        ids = range(offset, min(offset + 2, 5))
+        res = {
+            "collection": [
+                {"kind": "track", "id": i, "title": "Same", "streamable": True}
+                for i in ids
+            ]
+        }
+        if offset + 2 < 5:
+            res["next_href"] = (
+                f"https://api.soundcloud.com/me/favorites?offset={offset + 2}"
+            )
+        return res
+
+    def test_liked_fetches_only_first_page(self):
+        refs = self.library.browse("soundcloud:directory:liked")
+
+        assert [ref.uri for ref in refs] == [
+            "soundcloud:song/Same.0",
+            "soundcloud:song/Same.1",
+            "soundcloud:directory:liked/page/2",
+        ]
+        assert refs[-1].type == "directory"
+        self.remote._get.assert_called_once()
+
+    def test_liked_next_pages(self):
+        refs = self.library.browse("soundcloud:directory:liked/page/3")
+
+        assert [ref.uri for ref in refs] == ["soundcloud:song/Same.4"]
+        assert self.remote._get.call_count == 3
+
+        self.library.browse("soundcloud:directory:liked/page/2")
+        assert self.remote._get.call_count == 3
+
+    def test_pages_end_at_max_items(self):
+        self.remote.max_items = 4
+
+        refs = self.library.browse("soundcloud:directory:liked/page/2")
+
+        assert [ref.type for ref in refs] == ["track", "track"]
+
+    def test_keeps_tracks_with_the_same_name(self):
+        refs = self.library.tracklist_to_vfs(
+            [
+                {"kind": "track", "id": i, "title": "Same", "streamable": True}
+                for i in range(3)
+            ]
+        )
+
+        assert len(refs) == 3
+
+    def test_stream_is_paged_locally(self):
+        self.remote.get_user_stream = mock.Mock(
+            return_value=[
+                TrackRecord(f"soundcloud:song/T{i}.{i}", name=f"T{i}") for i in range(5)
+            ]
+        )
+
+        refs = self.library.browse("soundcloud:directory:stream/page/2")
+
+        assert [ref.uri for ref in refs] == [
+            "soundcloud:song/T2.2",
+            "soundcloud:song/T3.3",
+            "soundcloud:directory:stream/page/3",
+        ]
+        self.remote.get_user_stream.assert_called_once_with()
+
+    def test_first_page_is_served_from_store_after_restart(self):
+        tmp_dir = TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = Path(tmp_dir.name) / "metadata.sqlite3"
+        self.remote.store = MetadataStore(path)
+        refs = self.library.browse("soundcloud:directory:liked")
+
+        restarted = SoundCloudClient(get_config(auth_token="1-fake-token"))  # noqa: S106
+        self.addCleanup(restarted.close)
+        restarted.explore_songs = 2
+        restarted.store = MetadataStore(path)
+        restarted._get = mock.Mock(side_effect=self.get_page)
+        restarted._background = mock.Mock()
+        library = SoundCloudLibraryProvider(backend=mock.Mock(remote=restarted))
+
+        assert library.browse("soundcloud:directory:liked") == refs
+        restarted._get.assert_not_called()
+        restarted._background.submit.assert_called_once()
@@ -0,0 +1,97 @@
+import unittest
+
+from mopidy.models import Track
+
+from mopidy_soundcloud.query import (
+    SearchResults,
+    date_range,
+    normalize_query,
+    plan_search,
+)
+
+
+class DateRangeTest(unittest.TestCase):
+    def test_year(self):
+        assert date_range("2014") == ("2014-01-01 00:00:00", "2014-12-31 23:59:59")
+
+    def test_month(self):
+        assert date_range("2016-02") == ("2016-02-01 00:00:00", "2016-02-29 23:59:59")
+        assert date_range("2014-12") == ("2014-12-01 00:00:00", "2014-12-31 23:59:59")
+
+    def test_day(self):
+        assert date_range("2014-05-21") == (
+            "2014-05-21 00:00:00",
+            "2014-05-21 23:59:59",
+        )
+
+    def test_invalid(self):
+        assert date_range("last year") is None
+        assert date_range("2014-13") is None
+
+
+class PlanSearchTest(unittest.TestCase):
+    def test_text_fields_are_combined(self):
+        query = {"artist": ["Pelican"], "track_name": ["Deny"], "any": ["live"]}
+        assert plan_search(query) == [[("q", "Pelican Deny live")]]
+
+    def test_text_query(self):
+        assert plan_search("Pelican") == [[("q", "Pelican")]]
+
+    def test_genres_are_filtered(self):
+        assert plan_search({"any": ["live"], "genre": ["Metal", "Rock"]}) == [
+            [("q", "live"), ("genres", "Metal,Rock")]
+        ]
+
+    def test_each_date_gets_a_request(self):
+        plans = plan_search({"artist": ["Pelican"], "date": ["2009", "2013", "2009"]})
+        assert plans == [
+            [
+                ("q", "Pelican"),
+                ("created_at[from]", "2009-01-01 00:00:00"),
+                ("created_at[to]", "2009-12-31 23:59:59"),
+            ],
+            [
+                ("q", "Pelican"),
+                ("created_at[from]", "2013-01-01 00:00:00"),
+                ("created_at[to]", "2013-12-31 23:59:59"),
+            ],
+        ]
+
+    def test_unsupported_fields_are_ignored(self):
+        assert plan_search({"track_no": ["3"]}) == []
+        assert plan_search({"any": [" "]}) == []
+
+
+class NormalizeQueryTest(unittest.TestCase):
+    def test_equivalent_queries_have_same_key(self):
+        assert normalize_query(
+            {"artist": ["Pelican"], "any": ["Deny  the"]}
+        ) == normalize_query({"any": ["deny the"], "artist": "pelican"})
+
+    def test_text_query(self):
+        assert normalize_query("Pelican") == normalize_query({"any": ["pelican"]})
+
+
+class SearchResultsTest(unittest.TestCase):
+    def test_stops_at_budget(self):
+        results = SearchResults(budget=2, requests=1)
+        results.add([Track(uri=f"soundcloud:song/{i}") for i in range(3)])
+        assert results.full
+        assert len(results.tracks()) == 2
+
+    def test_waits_for_first_page_of_every_request(self):
+        results = SearchResults(budget=10, requests=2)
+        results.first_page_done()
+        assert results.wait(timeout=0) == []
+        assert not results._first_pages.is_set()
+        results.first_page_done()
+        assert results._first_pages.is_set()
+        assert not results.complete
+
+    def test_fails_if_a_request_ends_without_first_page(self):
+        results = SearchResults(budget=10, requests=2)
+        results.first_page_done()
+        assert not results.failed
+        results.first_page_done(failed=True)
+        assert results.failed
+        assert results.wait(timeout=0) == []
@@ -0,0 +1,209 @@
+import io
+import unittest
+from unittest import mock
+
+import pytest
+import requests
+
+from mopidy_soundcloud.ratelimit import (
+    RateLimiter,
+    RetryPolicy,
+    ThrottlingHttpAdapter,
+    TokenBucket,
+    parse_rate_limit_reset,
+    parse_retry_after,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(
+            rate=2, burst=3, clock=self.clock, sleep=self.clock.sleep
+        )
+
+    def test_allows_burst(self):
+        assert all(self.bucket.acquire(blocking=False) for _ in range(3))
+        assert not self.bucket.acquire(blocking=False)
+
+    def test_refills_at_rate(self):
+        for _ in range(3):
+            self.bucket.acquire()
+        self.clock.now += 0.5
+        assert self.bucket.acquire(blocking=False)
+        assert not self.bucket.acquire(blocking=False)
+
+    def test_blocking_waits_for_token(self):
+        for _ in range(3):
+            self.bucket.acquire()
+        assert self.bucket.acquire()
+        assert self.clock.sleeps == [0.5]
+
+    def test_timeout(self):
+        for _ in range(3):
+            self.bucket.acquire()
+        assert not self.bucket.acquire(timeout=0.2)
+        assert self.clock.sleeps == []
+        assert self.bucket.acquire(timeout=0.5)
+        assert self.clock.now == 1000.5
+
+    def test_pause(self):
+        self.bucket.pause(30)
+        assert not self.bucket.acquire(blocking=False)
+        assert self.bucket.acquire()
+        assert self.clock.now == 1030.5
+
+
+class RateLimiterTest(unittest.TestCase):
+    def test_fail_fast_is_per_block(self):
+        limiter = RateLimiter(rate=1, burst=1)
+        assert limiter.blocking
+        with limiter.fail_fast():
+            assert not limiter.blocking
+        assert limiter.blocking
+
+
+class HeaderParsingTest(unittest.TestCase):
+    def test_retry_after_seconds(self):
+        assert parse_retry_after("120") == 120
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("soon") is None
+
+    def test_retry_after_date(self):
+        now = 784111777 - 10
+        wait = parse_retry_after("Sun, 06 Nov 1994 08:49:37 GMT", now=lambda: now)
+        assert wait == 10
+
+    def test_rate_limit_reset(self):
+        assert parse_rate_limit_reset({"X-RateLimit-Remaining": "5"}) is None
+        headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "60"}
+        assert parse_rate_limit_reset(headers) == 60
+        headers["X-RateLimit-Reset"] = "2000000060"
+        assert parse_rate_limit_reset(headers, now=lambda: 2000000000) == 60
+
+
+class ThrottlingHttpAdapterTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(
+            rate=1, burst=1, clock=self.clock, sleep=self.clock.sleep
+        )
+        self.adapter = ThrottlingHttpAdapter(self.limiter)
+        self.request = requests.Request("GET", "https://api.soundcloud.com/me")
+        self.request = self.request.prepare()
+
+    def send(self, response):
+        with mock.patch(
+            "requests.adapters.HTTPAdapter.send", return_value=response
+        ) as send:
+            return self.adapter.send(self.request), send
+
+    def make_response(self, status=200, headers=None):
+        response = requests.Response()
+        response.status_code = status
+        response.headers.update(headers or {})
+        return response
+
+    def test_fails_fast_with_429(self):
+        self.send(self.make_response())
+        with self.limiter.fail_fast():
+            response, send = self.send(self.make_response())
+        assert response.status_code == 429
+        send.assert_not_called()
+
+    def test_waits_for_token(self):
+        self.send(self.make_response())
+        response, _send = self.send(self.make_response())
+        assert response.status_code == 200
+        assert self.clock.sleeps == [1]
+
+    def test_honors_retry_after(self):
+        self.send(self.make_response(429, {"Retry-After": "20"}))
+        self.send(self.make_response())
+        assert self.clock.now == 1021
+
+    def test_fails_instead_of_waiting_out_long_pauses(self):
+        headers = {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "36000"}
+        self.send(self.make_response(429, headers))
+        response, send = self.send(self.make_response())
+        assert response.status_code == 429
+        assert self.clock.sleeps == []
+        send.assert_not_called()
+
+
+class RetryTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = RateLimiter(
+            rate=100, burst=100, clock=self.clock, sleep=self.clock.sleep
+        )
+        self.retry = RetryPolicy(max_retries=3, max_time=10, jitter=lambda: 1)
+        self.adapter = ThrottlingHttpAdapter(self.limiter, retry=self.retry)
+
+    def send(self, method, *responses):
+        request = requests.Request(method, "https://api.soundcloud.com/me").prepare()
+        with mock.patch(
+            "requests.adapters.HTTPAdapter.send", side_effect=responses
+        ) as send:
+            return self.adapter.send(request), send
+
+    def make_response(self, status=200):
+        response = requests.Response()
+        response.status_code = status
+        response.raw = io.BytesIO()
+        return response
+
+    def test_retries_server_errors_with_backoff(self):
+        response, send = self.send(
+            "GET",
+            self.make_response(503),
+            requests.ConnectionError("reset"),
+            self.make_response(),
+        )
+        assert response.status_code == 200
+        assert send.call_count == 3
+        assert self.clock.sleeps == [0.5, 1.0]
+        assert self.adapter.retries == 2
+
+    def test_gives_up_after_max_retries(self):
+        response, send = self.send("GET", *(self.make_response(500) for _ in range(5)))
+        assert response.status_code == 500
+        assert send.call_count == 4
+        assert self.adapter.failures == 1
+
+    def test_gives_up_after_max_time(self):
+        self.retry.max_time = 2
+        _response, send = self.send("GET", *(self.make_response(500) for _ in range(5)))
+        assert send.call_count == 3
+        assert sum(self.clock.sleeps) <= 2
+
+    def test_raises_connection_error_when_giving_up(self):
+        self.retry.max_retries = 0
+        with pytest.raises(requests.ConnectionError):
+            self.send("GET", requests.ConnectionError("reset"))
+
+    def test_does_not_retry_non_idempotent_requests(self):
+        response, send = self.send("POST", self.make_response(503))
+        assert response.status_code == 503
+        send.assert_called_once()
+
+    def test_does_not_retry_client_errors(self):
+        _response, send = self.send("GET", self.make_response(404))
+        send.assert_called_once()
+
+    def test_sets_default_timeout(self):
+        _response, send = self.send("GET", self.make_response())
+        assert send.call_args.kwargs["timeout"] == self.retry.request_timeout
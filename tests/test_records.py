@@ -0,0 +1,86 @@
+import gc
+import tracemalloc
+import unittest
+
+from mopidy.models import Album, Artist, Ref, Track
+
+from mopidy_soundcloud.records import TrackRecord
+
+
+def track_data(i):
+    return {
+        "uri": f"soundcloud:song/Track {i}.{100000000 + i}",
+        "name": f"Track {i}",
+        "artist": f"Artist {i % 500}",
+        "length": 200000 + i,
+        "comment": f"https://soundcloud.com/artist-{i % 500}/track-{i}",
+    }
+
+
+def build_track(data):
+    # How tracks were cached before records
+    return Track(
+        uri=data["uri"],
+        name=data["name"],
+        artists=[Artist(name=data["artist"])],
+        album=Album(name="SoundCloud"),
+        length=data["length"],
+        comment=data["comment"],
+    )
+
+
+def build_record(data):
+    return TrackRecord(
+        data["uri"],
+        name=data["name"],
+        artist=data["artist"],
+        length=data["length"],
+        comment=data["comment"],
+    )
+
+
+def allocated_size(build, count):
+    """Returns the bytes taken by ``count`` cached tracks made by ``build``"""
+    tracks_data = [track_data(i) for i in range(count)]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        tracks = [build(data) for data in tracks_data]
+        gc.collect()
+        size, _peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert len(tracks) == count
+    return size
+
+
+class TrackRecordTest(unittest.TestCase):
+    def test_to_track(self):
+        data = track_data(1)
+        assert build_record(data).to_track() == build_track(data)
+
+    def test_to_track_without_title(self):
+        assert TrackRecord("soundcloud:song/.1").to_track() == Track(
+            uri="soundcloud:song/.1", length=0, comment=""
+        )
+
+    def test_to_ref(self):
+        assert build_record(track_data(1)).to_ref() == Ref.track(
+            uri="soundcloud:song/Track 1.100000001", name="Track 1"
+        )
+
+    def test_artists_are_interned(self):
+        first = build_record(track_data(1))
+        second = build_record(track_data(501))
+        assert first.artist is second.artist
+
+    def test_equality(self):
+        assert build_record(track_data(1)) == build_record(track_data(1))
+        assert build_record(track_data(1)) != build_record(track_data(2))
+        assert len({build_record(track_data(1)), build_record(track_data(1))}) == 1
+
+    def test_memory_benchmark(self):
+        # 5k tracks take ~3.3 MiB as Track models and ~0.4 MiB as records
+        tracks = allocated_size(build_track, 5000)
+        records = allocated_size(build_record, 5000)
+        assert records * 4 < tracks
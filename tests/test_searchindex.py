@@ -0,0 +1,83 @@
+import unittest
+
+from mopidy.models import Album, Artist, Track
+
+from mopidy_soundcloud.searchindex import SearchIndex, is_indexed, rank
+
+
+def make_track(track_id, name, artist, permalink=""):
+    return Track(
+        uri=f"soundcloud:song/{track_id}.{track_id}",
+        name=name,
+        artists=[Artist(name=artist)],
+        album=Album(name="SoundCloud"),
+        comment=f"https://soundcloud.com/{permalink}",
+    )
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex()
+        self.munching = make_track(1, "Munching at Tiannas house", "Nick Goldsmith")
+        self.pelican = make_track(
+            2, "Deny The Absolute", "Pelican", "pelicansong/deny-the-absolute"
+        )
+        self.city = make_track(3, "The City", "Café Tacvba")
+        for track in (self.munching, self.pelican, self.city):
+            self.index.add(track)
+
+    def test_matches_all_words_in_any_field(self):
+        assert self.index.search({"any": ["pelican absolute"]}) == [self.pelican]
+        assert self.index.search({"any": ["pelican city"]}) == []
+
+    def test_matches_fields(self):
+        assert self.index.search({"artist": ["pelican"]}) == [self.pelican]
+        assert self.index.search({"track_name": ["pelican"]}) == []
+        assert self.index.search({"comment": ["pelicansong"]}) == [self.pelican]
+
+    def test_ignores_case_and_accents(self):
+        assert self.index.search({"artist": ["CAFE"]}) == [self.city]
+
+    def test_exact(self):
+        query = {"track_name": ["deny the absolute"]}
+        assert self.index.search(query, exact=True) == [self.pelican]
+        query = {"track_name": ["deny"]}
+        assert self.index.search(query, exact=True) == []
+
+    def test_title_matches_come_first(self):
+        pelican_city = make_track(4, "Pelican City", "Someone")
+        self.index.add(pelican_city)
+        self.index.add(self.pelican)
+        assert self.index.search({"any": ["pelican"]}) == [pelican_city, self.pelican]
+
+    def test_replaces_changed_tracks(self):
+        renamed = self.pelican.replace(name="Ataraxia")
+        self.index.add(renamed)
+        assert self.index.search({"track_name": ["absolute"]}) == []
+        assert self.index.search({"any": ["ataraxia"]}) == [renamed]
+
+    def test_forgets_oldest_tracks(self):
+        index = SearchIndex(maxsize=2)
+        for track in (self.munching, self.pelican, self.city):
+            index.add(track)
+        assert len(index) == 2
+        assert self.munching.uri not in index
+        assert index.search({"any": ["munching"]}) == []
+
+    def test_rank(self):
+        pelican_city = make_track(4, "Pelican City", "Someone")
+        tracks = [self.pelican, self.munching, pelican_city]
+        assert rank(tracks, {"any": ["pelican city"]}) == [
+            pelican_city,
+            self.pelican,
+            self.munching,
+        ]
+
+    def test_rank_exact_drops_other_tracks(self):
+        tracks = [self.munching, self.pelican]
+        assert rank(tracks, {"artist": ["Pelican"]}, exact=True) == [self.pelican]
+
+    def test_is_indexed(self):
+        assert is_indexed("pelican")
+        assert is_indexed({"artist": ["Pelican"], "date": []})
+        assert not is_indexed({"artist": ["Pelican"], "date": ["2014"]})
@@ -0,0 +1,38 @@
+import unittest
+from tempfile import TemporaryDirectory
+
+from mopidy_soundcloud.store import MetadataStore
+
+
+class MetadataStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.path = f"{self.tmp_dir.name}/metadata.sqlite3"
+        self.store = MetadataStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_roundtrip(self):
+        self.store.set("me/favorites", [{"id": 1, "title": "Track"}])
+        assert "me/favorites" in self.store
+        assert self.store.get("me/favorites") == [{"id": 1, "title": "Track"}]
+
+    def test_missing_entry(self):
+        assert "me" not in self.store
+        assert self.store.get("me", {}) == {}
+
+    def test_survives_reopening(self):
+        self.store.set("me", {"username": "Nick Steel 3"})
+        self.store.close()
+        self.store = MetadataStore(self.path)
+        assert self.store.get("me") == {"username": "Nick Steel 3"}
+
+    def test_prune_deletes_oldest_responses(self):
+        for url in ("a", "b", "c"):
+            self.store.set(url, "x" * 8)
+        self.store.prune(25)
+        assert "a" not in self.store
+        assert "b" in self.store
+        assert "c" in self.store